@@ -6,17 +6,22 @@ Adds episodes with basic info from RSS - metadata filled manually or via lookup.
 Usage:
     python scripts/add_new_episode.py           # Add any missing episodes
     python scripts/add_new_episode.py --dry-run # Show what would be added
+    python scripts/add_new_episode.py --journal # Journal the inserts (see patch_journal.py)
 """
 
-import json
 import re
 import argparse
-import urllib.request
-import xml.etree.ElementTree as ET
 from datetime import datetime
-from pathlib import Path
+from itertools import islice
 
-FEED_URL = "https://feeds.megaphone.fm/the-rewatchables"
+import feed_parser
+import http_cache
+import metrics
+import patch_journal
+import podcast_feed
+from episode_store import EpisodeStore
+
+FEED_URL = podcast_feed.FEED_URL
 
 # Patterns that indicate non-movie episodes (mailbags, lists, specials)
 SKIP_PATTERNS = [
@@ -31,15 +36,15 @@ SKIP_PATTERNS = [
     r'\bholiday\b',
     r'\bspecial\b',
 ]
+_NON_MOVIE_RE = feed_parser.alternation(SKIP_PATTERNS)
+
+_YEAR_RE = re.compile(r'\b(19\d{2}|20\d{2})\b')
+_SLUG_SEP_RE = re.compile(r'[^a-z0-9]+')
 
 
 def is_non_movie_episode(title):
     """Check if episode title indicates a non-movie episode (mailbag, list, etc.)."""
-    title_lower = title.lower()
-    for pattern in SKIP_PATTERNS:
-        if re.search(pattern, title_lower):
-            return True
-    return False
+    return bool(_NON_MOVIE_RE.search(title))
 
 
 def extract_year_from_description(desc, movie_title=None):
@@ -63,18 +68,21 @@ def extract_year_from_description(desc, movie_title=None):
         desc = re.sub(r'\b%s\b' % re.escape(movie_title), ' ', desc,
                       flags=re.IGNORECASE)
     current_year = datetime.now().year
-    for m in re.finditer(r'\b(19\d{2}|20\d{2})\b', desc):
+    for m in _YEAR_RE.finditer(desc):
         y = int(m.group(1))
         if 1920 <= y <= current_year + 1:
             return y
     return None
 
 
-def fetch_feed():
-    """Fetch and parse the podcast RSS feed."""
-    with urllib.request.urlopen(FEED_URL, timeout=30) as response:
-        xml_data = response.read()
-    return ET.fromstring(xml_data)
+def fetch_feed(fingerprint=None):
+    """Open the podcast RSS feed for streaming.
+
+    resp.not_modified is set when the feed is unchanged since the last run
+    that finished adding episodes to a database with the same
+    `fingerprint`; otherwise resp.items() yields <item> elements.
+    """
+    return podcast_feed.fetch(FEED_URL, consumer="add_new_episode", stream=True, fingerprint=fingerprint)
 
 
 def get_default_streaming():
@@ -94,77 +102,30 @@ def get_default_streaming():
 
 def parse_episode_from_feed(item):
     """Parse a single episode from RSS item."""
-    title = item.find('title').text or ""
-    pub_date = item.find('pubDate').text or ""
-    desc_el = item.find('description')
-    description = (desc_el.text if desc_el is not None and desc_el.text else "") or ""
+    parsed = feed_parser.parse_item(item)
+    date_str = parsed.date or datetime.now().strftime("%Y-%m-%d")
+    movie_title = parsed.movie_title
 
-    # Parse the date
-    try:
-        date_obj = datetime.strptime(pub_date[:16], "%a, %d %b %Y")
-        date_str = date_obj.strftime("%Y-%m-%d")
-    except:
-        date_str = datetime.now().strftime("%Y-%m-%d")
-
-    # Extract movie title - handle both straight and curly quotes
-    # Curly quotes: ' ' " " (U+2018, U+2019, U+201C, U+201D)
-    all_quotes = '"\'\u2018\u2019\u201c\u201d'
-
-    # Strip the host suffix first ("...With Bill Simmons, ..."), so internal
-    # apostrophes in the movie title (e.g. "There's Something About Mary") don't
-    # confuse the quote-matching regex below.
-    prefix = re.split(r'\s+[Ww]ith\s+', title, maxsplit=1)[0]
-    clean_title = title.strip().strip(all_quotes)
-
-    # Greedy match from the first opening quote to the last closing quote in the
-    # prefix. Greedy is safe here because we've already chopped off the hosts.
-    quoted_match = re.search(
-        r'["\'\u2018\u201c](.+)["\'\u2019\u201d]', prefix
-    )
-    if quoted_match:
-        movie_title = quoted_match.group(1).strip()
-    else:
-        movie_title = prefix
-
-    # Clean up any remaining quotes, pipes, whitespace
-    movie_title = re.sub(r'^["\'\u2018\u2019\u201c\u201d\s]+|["\'\u2018\u2019\u201c\u201d\s|]+$', '', movie_title)
-
-    # Detect live episodes so they render as "Movie (Live)" and don't collide
-    # with the original movie's entry on the site.
-    is_live = bool(re.search(r'\blive\b', clean_title, re.IGNORECASE))
-
-    # Extract hosts
-    hosts = []
-    hosts_match = re.search(r'[Ww]ith\s+(.+)$', title)
-    if hosts_match:
-        hosts_str = hosts_match.group(1)
-        raw_hosts = re.split(r',\s+and\s+|,\s+|\s+and\s+', hosts_str)
-        hosts = [h.strip() for h in raw_hosts if h.strip()]
+    # Live episodes render as "Movie (Live)" so they don't collide with the
+    # original movie's entry on the site.
+    is_live = parsed.is_live
+    hosts = parsed.hosts
+    description = parsed.description
 
     display_title = f"{movie_title} (Live)" if is_live else movie_title
-    base_slug = re.sub(r'[^a-z0-9]+', '-', movie_title.lower()).strip('-')
+    base_slug = _SLUG_SEP_RE.sub('-', movie_title.lower()).strip('-')
     episode_id = f"{base_slug}-live-{date_str}" if is_live else base_slug
 
     return {
         'id': episode_id,
         'title': display_title,
-        'full_title': title,
+        'full_title': parsed.full_title,
         'date': date_str,
         'hosts': hosts,
         'year_hint': extract_year_from_description(description, movie_title),
     }
 
 
-def load_database():
-    """Load episodes from database."""
-    script_dir = Path(__file__).parent
-    data_file = script_dir.parent / "src" / "data" / "episodes.json"
-
-    with open(data_file, 'r') as f:
-        data = json.load(f)
-    return data, data_file
-
-
 def create_episode_object(parsed_ep):
     """Create episode object with RSS data. Metadata to be filled manually."""
     today = datetime.now().strftime("%Y-%m-%d")
@@ -203,13 +164,10 @@ def create_episode_object(parsed_ep):
     }
 
 
-def find_missing_episodes(feed_items, db_episodes, limit=5):
+def find_missing_episodes(feed_items, store, limit=5):
     """Find episodes in feed that aren't in database."""
-    db_dates = set(ep.get('episodeDate', '') for ep in db_episodes)
-    db_titles = set(ep.get('title', '').lower() for ep in db_episodes)
-
     missing = []
-    for item in feed_items[:limit]:
+    for item in islice(feed_items, limit):
         parsed = parse_episode_from_feed(item)
 
         # Skip non-movie episodes (mailbags, lists, specials)
@@ -217,8 +175,11 @@ def find_missing_episodes(feed_items, db_episodes, limit=5):
             print(f"  Skipping non-movie episode: {parsed['title']}")
             continue
 
-        if (parsed['date'] not in db_dates and
-            parsed['title'].lower() not in db_titles):
+        if (not store.has_date(parsed['date']) and
+            not store.has_title(parsed['title'])):
+            similar = store.similar_titles(parsed['title'], limit=1)
+            if similar:
+                print(f"  ⚠️  {parsed['title']}: similar title already in database: {similar[0][1]['title']}")
             missing.append(parsed)
 
     return missing
@@ -228,28 +189,38 @@ def main():
     parser = argparse.ArgumentParser(description='Add new episodes to database')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be added')
     parser.add_argument('--count', type=int, default=5, help='Episodes to check')
+    http_cache.add_cache_args(parser)
+    patch_journal.add_journal_args(parser)
+    metrics.add_metrics_args(parser)
 
     args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("add_new_episode", args)
+
+    print("Loading database...")
+    store = EpisodeStore.load()
 
     print("Fetching podcast feed...")
     try:
-        root = fetch_feed()
-        channel = root.find('channel')
-        feed_items = channel.findall('item')
+        resp = fetch_feed(store.fingerprint())
+        if resp.not_modified:
+            print("✓ Feed unchanged since the last run against this database. Nothing to add.")
+            return 0
+        # Only the newest --count items are read; the rest of the feed is
+        # never downloaded.
+        feed_items = list(resp.items(limit=args.count))
     except Exception as e:
         print(f"Error fetching feed: {e}")
         return 1
 
-    print("Loading database...")
-    data, data_file = load_database()
-    db_episodes = data['episodes']
-
     print(f"Checking {args.count} recent episodes...\n")
 
-    missing = find_missing_episodes(feed_items, db_episodes, limit=args.count)
+    missing = find_missing_episodes(feed_items, store, limit=args.count)
 
     if not missing:
         print("✓ Database is up to date!")
+        if not args.dry_run:
+            podcast_feed.remember(resp, store.fingerprint())
         return 0
 
     print(f"Found {len(missing)} new episode(s):\n")
@@ -260,13 +231,17 @@ def main():
 
         if not args.dry_run:
             new_episode = create_episode_object(parsed_ep)
-            data['episodes'].insert(0, new_episode)
+            if store.has_id(new_episode['id']):
+                # Same slug as an existing film (e.g. a re-cover under a new
+                # title) — disambiguate by air date rather than clobbering it.
+                new_episode['id'] = f"{new_episode['id']}-{parsed_ep['date']}"
+            store.insert(new_episode)
             added.append(new_episode['title'])
         print()
 
     if not args.dry_run and added:
-        with open(data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        patch_journal.saver(store, args, "add_new_episode")()
+        podcast_feed.remember(resp, store.fingerprint())
 
         print(f"\n✓ Added {len(added)} episode(s) to database")
         print("\nTo complete these entries:")
@@ -0,0 +1,78 @@
+"""
+Crash-safe file replacement and advisory locking for shared state files.
+
+write_atomic() writes to a temp file in the same directory, fsyncs it,
+renames it over the target and fsyncs the directory, so a crash at any
+point leaves either the old file or the new one — never a truncated mix.
+
+locked() takes an exclusive advisory lock on a sidecar ".<name>.lock" file
+for the duration of a read-modify-write, so two pipeline stages saving the
+same file at once queue up instead of interleaving. The lock is advisory:
+it only coordinates processes that also use locked().
+
+Usage:
+    from atomic_file import locked, write_atomic
+
+    with locked(path):
+        current = path.read_bytes()
+        ...
+        write_atomic(path, new_bytes)
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, fall back to unlocked writes
+    fcntl = None
+
+
+def write_atomic(path, data):
+    """Replace `path` with `data` (str or bytes) via temp file + fsync + rename."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory):
+    # Makes the rename itself durable; not supported on every platform.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive advisory lock for `path` (blocks until available)."""
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f".{path.name}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-item feed parsing cost against a recorded feed fixture.
+
+Usage:
+    python3 scripts/bench_feed_parser.py
+    python3 scripts/bench_feed_parser.py --fixture scripts/fixtures/feed.xml --rounds 200
+
+Times each script's title/host/date/skip path over every <item> in the
+fixture and prints microseconds per item, before and after the move to
+the shared feed_parser module. "Before" runs the per-script parsing code
+as it stood then, copied below with comments trimmed (uncompiled
+patterns, a re.search per skip pattern, strptime dates), so the
+comparison can be re-run.
+"""
+
+import argparse
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import add_new_episode
+import check_new_episodes
+import fetch_new_episodes
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "feed.xml"
+
+
+# --- Before: per-script parsing prior to feed_parser ------------------------
+
+def _old_parse_episodes_from_feed(items, limit=10):
+    episodes = []
+
+    for item in islice(items, limit):
+        title = item.find('title').text or ""
+        pub_date = item.find('pubDate').text or ""
+        description = item.find('description').text or ""
+
+        try:
+            date_obj = datetime.strptime(pub_date[:16], "%a, %d %b %Y")
+            date_str = date_obj.strftime("%Y-%m-%d")
+        except ValueError:
+            date_str = pub_date
+
+        movie_match = re.match(r'^["\']?([^"\']+)["\']?\s+[Ww]ith', title)
+        if movie_match:
+            movie_title = movie_match.group(1).strip()
+        else:
+            movie_title = title.split(" With")[0].strip().strip('"\'')
+
+        hosts_match = re.search(r'[Ww]ith\s+(.+)$', title)
+        hosts = []
+        if hosts_match:
+            hosts = re.split(r',\s+and\s+|,\s+|\s+and\s+', hosts_match.group(1))
+            hosts = [h.strip() for h in hosts if h.strip()]
+
+        episodes.append({
+            'title': movie_title,
+            'full_title': title,
+            'date': date_str,
+            'hosts': hosts,
+            'description': description[:200] + "..." if len(description) > 200 else description
+        })
+
+    return episodes
+
+
+def _old_is_non_movie_episode(title):
+    title_lower = title.lower()
+    for pattern in add_new_episode.SKIP_PATTERNS:
+        if re.search(pattern, title_lower):
+            return True
+    return False
+
+
+def _old_extract_year_from_description(desc, movie_title=None):
+    if not desc:
+        return None
+    if movie_title:
+        desc = re.sub(r'\b%s\b' % re.escape(movie_title), ' ', desc, flags=re.IGNORECASE)
+    current_year = datetime.now().year
+    for m in re.finditer(r'\b(19\d{2}|20\d{2})\b', desc):
+        y = int(m.group(1))
+        if 1920 <= y <= current_year + 1:
+            return y
+    return None
+
+
+def _old_parse_episode_from_feed(item):
+    title = item.find('title').text or ""
+    pub_date = item.find('pubDate').text or ""
+    desc_el = item.find('description')
+    description = (desc_el.text if desc_el is not None and desc_el.text else "") or ""
+
+    try:
+        date_obj = datetime.strptime(pub_date[:16], "%a, %d %b %Y")
+        date_str = date_obj.strftime("%Y-%m-%d")
+    except ValueError:
+        date_str = datetime.now().strftime("%Y-%m-%d")
+
+    all_quotes = '"\'‘’“”'
+    prefix = re.split(r'\s+[Ww]ith\s+', title, maxsplit=1)[0]
+    clean_title = title.strip().strip(all_quotes)
+
+    quoted_match = re.search(r'["\'‘“](.+)["\'’”]', prefix)
+    movie_title = quoted_match.group(1).strip() if quoted_match else prefix
+    movie_title = re.sub(r'^["\'‘’“”\s]+|["\'‘’“”\s|]+$', '', movie_title)
+
+    is_live = bool(re.search(r'\blive\b', clean_title, re.IGNORECASE))
+
+    hosts = []
+    hosts_match = re.search(r'[Ww]ith\s+(.+)$', title)
+    if hosts_match:
+        raw_hosts = re.split(r',\s+and\s+|,\s+|\s+and\s+', hosts_match.group(1))
+        hosts = [h.strip() for h in raw_hosts if h.strip()]
+
+    display_title = f"{movie_title} (Live)" if is_live else movie_title
+    base_slug = re.sub(r'[^a-z0-9]+', '-', movie_title.lower()).strip('-')
+    episode_id = f"{base_slug}-live-{date_str}" if is_live else base_slug
+
+    return {
+        'id': episode_id,
+        'title': display_title,
+        'full_title': title,
+        'date': date_str,
+        'hosts': hosts,
+        'year_hint': _old_extract_year_from_description(description, movie_title),
+    }
+
+
+def _old_parse_title(raw_title):
+    title = re.sub(r"^The Rewatchables:\s*", "", raw_title, flags=re.IGNORECASE)
+    title = re.sub(r"\s+[Ww]ith\s+.*$", "", title)
+    title = re.sub(r"\s*['\"]\s*The Re-.*$", "", title)
+    title = re.sub(r"\s*\(Part\s+\w+\)", "", title, flags=re.IGNORECASE)
+    title = re.sub(r"\s*\(\d{4}\)", "", title)
+    title = title.strip()
+    title = re.sub(r"^[‘’“”'\"′″]+", "", title)
+    title = re.sub(r"[‘’“”'\"′″]+$", "", title)
+    return title.strip()
+
+
+def _old_should_skip(title):
+    title_lower = title.lower()
+    return any(re.search(pattern, title_lower) for pattern in fetch_new_episodes.SKIP_PATTERNS)
+
+
+# --- Cases: (before, after) per script ---------------------------------------
+
+def check_new_before(items):
+    _old_parse_episodes_from_feed(items, limit=len(items))
+
+
+def check_new(items):
+    check_new_episodes.parse_episodes_from_feed(items, limit=len(items))
+
+
+def add_new_before(items):
+    for item in items:
+        parsed = _old_parse_episode_from_feed(item)
+        _old_is_non_movie_episode(parsed['full_title'])
+
+
+def add_new(items):
+    for item in items:
+        parsed = add_new_episode.parse_episode_from_feed(item)
+        add_new_episode.is_non_movie_episode(parsed['full_title'])
+
+
+def fetch_new_before(items):
+    for item in items:
+        title = _old_parse_title(item.find("title").text or "")
+        _old_should_skip(title)
+
+
+def fetch_new(items):
+    for item in items:
+        title = fetch_new_episodes.parse_title(item.find("title").text or "")
+        fetch_new_episodes.should_skip(title)
+
+
+CASES = [
+    ("check_new_episodes.parse_episodes_from_feed", check_new_before, check_new),
+    ("add_new_episode.parse_episode_from_feed", add_new_before, add_new),
+    ("fetch_new_episodes.parse_title", fetch_new_before, fetch_new),
+]
+
+
+def time_per_item(fn, items, rounds):
+    fn(items)  # warm up
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feed item parsing")
+    parser.add_argument("--fixture", type=Path, default=FIXTURE_PATH)
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    items = ET.parse(args.fixture).getroot().find("channel").findall("item")
+    print(f"{len(items)} items x {args.rounds} rounds from {args.fixture}\n")
+    print(f"  {'':45s} {'before':>8s} {'after':>8s}  µs/item")
+
+    for name, before_fn, after_fn in CASES:
+        before = time_per_item(before_fn, items, args.rounds)
+        after = time_per_item(after_fn, items, args.rounds)
+        print(f"  {name:45s} {before:8.2f} {after:8.2f}  x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
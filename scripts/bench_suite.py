@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-episode hot paths on synthetic catalogs.
+
+Generates catalogs of 500, 10k and 100k episodes (plus matching feed items
+and Apple / JustWatch search payloads) from a fixed seed and times:
+
+    apple.find_best_match          fetch_apple_podcast_urls, 5 results per title
+    streaming.find_best_match      fetch_streaming_availability, 5 edges per title
+    parse_title                    fetch_new_episodes
+    parse_episode_from_feed        add_new_episode, one <item> per episode
+    extract_year_from_description  add_new_episode
+    store.build                    EpisodeStore indexes over the whole catalog
+    get_stats / get_stale_movies   streaming_audit, over the whole catalog (get_stats
+                                   includes building the store it reads)
+    extract_genres                 enrich_metadata, one genre list per episode
+    title_index.build / .search    TitleIndex over the catalog; one typo'd lookup per 100 episodes
+    json.load / json.dump          episodes.json bytes ↔ data (episode_store.serialize)
+
+Builds (store.build, get_stats, title_index.build) start with the title
+normalization caches cleared, as the first build in a script run does.
+
+Each case reports the best of --rounds runs. --output writes the results as
+a JSON baseline; --compare checks a run against one and exits 1 if any case
+got more than --threshold slower (cases under --min-seconds are too noisy
+to judge and are only reported).
+
+Usage:
+    python3 scripts/bench_suite.py --output .cache/bench-baseline.json
+    python3 scripts/bench_suite.py --compare .cache/bench-baseline.json
+    python3 scripts/bench_suite.py --sizes 500,10000 --only find_best_match --rounds 3
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import date, timedelta
+from pathlib import Path
+
+import add_new_episode
+import enrich_metadata
+import fetch_apple_podcast_urls
+import fetch_new_episodes
+import fetch_streaming_availability
+import streaming_audit
+from episode_store import STREAMING_SERVICES, EpisodeStore, serialize
+import title_index
+from title_index import TitleIndex
+
+DEFAULT_SIZES = [500, 10_000, 100_000]
+DEFAULT_ROUNDS = 3
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_SECONDS = 0.005
+SEED = 1984
+
+_WORDS = [
+    "Heat", "Harbor", "Night", "Dark", "Last", "Big", "Red", "Running", "Midnight", "Gun",
+    "River", "Fire", "Blue", "Lost", "Wild", "Fast", "Cold", "Kid", "King", "City",
+    "Dream", "Road", "Storm", "Money", "Game", "Devil's", "Top", "Hard", "Good", "Bad",
+    "Boys", "Girls", "Summer", "Winter", "Ghost", "Star", "Time", "Lethal", "Weapon", "Job",
+]
+_HOSTS = ["Bill Simmons", "Chris Ryan", "Sean Fennessey", "Mallory Rubin", "Van Lathan", "Amanda Dobbins"]
+_DIRECTORS = ["Michael Mann", "Edward Zwick", "Tony Scott", "Nancy Meyers", "Kathryn Bigelow", "John Hughes"]
+_GENRE_LABELS = ["action film", "crime drama film", "romantic comedy film", "science fiction film",
+                 "thriller film", "buddy cop film", "sports film", "horror film", "war film", "musical film"]
+_STUDIOS = ["warner-bros", "universal", "paramount", "20th-century", "sony", "mgm", "miramax", "tristar"]
+
+
+def _title(rng, n):
+    words = rng.sample(_WORDS, rng.randint(1, 3))
+    if rng.random() < 0.4:
+        words.insert(0, "The")
+    title = " ".join(words)
+    roll = rng.random()
+    if roll < 0.05:
+        title += " II"
+    elif roll < 0.08:
+        title = f"{rng.randint(1941, 2049)}: {title}"
+    return f"{title} {n}" if rng.random() < 0.5 else title
+
+
+def make_catalog(size, seed=SEED):
+    """`size` synthetic episodes shaped like episodes.json entries."""
+    rng = random.Random(seed + size)
+    today = date.today()
+    episodes = []
+    for n in range(size):
+        title = _title(rng, n)
+        if rng.random() < 0.03:
+            title += " (Live)"
+        streaming = {s: rng.random() < 0.12 for s in STREAMING_SERVICES}
+        streaming["rentBuy"] = rng.sample(["Amazon", "Apple TV", "Google Play"], rng.randint(0, 2))
+        episodes.append({
+            "id": f"ep-{n}",
+            "title": title,
+            "year": rng.randint(1950, 2024),
+            "director": rng.choice(_DIRECTORS),
+            "episodeDate": (today - timedelta(days=n % 3000)).isoformat(),
+            "spotifyUrl": "https://open.spotify.com/show/1lUPomulZRPquVAOOd56EW",
+            "applePodcastsUrl": f"https://podcasts.apple.com/au/podcast/x/id1268527882?i={1000000000000 + n}",
+            "hosts": rng.sample(_HOSTS, 3),
+            "guests": [],
+            "genres": rng.sample(["Drama", "Comedy", "Action", "Crime", "Thriller"], 2),
+            "streaming": streaming,
+            "lastStreamingCheck": (today - timedelta(days=rng.randint(0, 120))).isoformat()
+                                  if rng.random() < 0.98 else "unknown",
+            "communityRating": {"average": 0, "votes": 0},
+            "studio": rng.choice(_STUDIOS),
+        })
+    return {"episodes": episodes}
+
+
+def _hosts_text(hosts):
+    return f"{', '.join(hosts[:-1])}, and {hosts[-1]}"
+
+
+def make_feed_items(episodes):
+    """One RSS <item> element per episode, in the Megaphone feed's shape."""
+    items = []
+    for ep in episodes:
+        item = ET.Element("item")
+        ET.SubElement(item, "title").text = f"‘{ep['title']}’ With {_hosts_text(ep['hosts'])}"
+        ET.SubElement(item, "description").text = (
+            f"{_hosts_text(ep['hosts'])} rewatch the {ep['year']} film '{ep['title']}'. "
+            "Plus, who won the movie and what has aged the worst?")
+        d = date.fromisoformat(ep["episodeDate"])
+        ET.SubElement(item, "pubDate").text = d.strftime("%a, %d %b %Y 10:00:00 -0000")
+        items.append(item)
+    return items
+
+
+def make_apple_results(episodes, seed=SEED):
+    """Five search results per episode: exact, sequel, live, year-suffixed and unrelated tracks."""
+    rng = random.Random(seed)
+    payloads = []
+    for n, ep in enumerate(episodes):
+        film = ep["title"].replace(" (Live)", "")
+        hosts = _hosts_text(ep["hosts"])
+        tracks = [f"'{film}' With {hosts}", f"'{film} II' With {hosts}",
+                  f"'{film}' Live From Boston With {hosts}", f"'{film} {ep['year'] - 20}' With {hosts}",
+                  f"'{episodes[(n + 7) % len(episodes)]['title']}' With {hosts}"]
+        rng.shuffle(tracks)
+        payloads.append([{"collectionName": "The Rewatchables", "trackName": t,
+                          "trackViewUrl": f"https://podcasts.apple.com/us/x?i={n}{k}"}
+                         for k, t in enumerate(tracks)])
+    return payloads
+
+
+def make_justwatch_results(episodes, seed=SEED):
+    """Five search edges per episode: remake, sequel, show, unrelated and the film itself."""
+    rng = random.Random(seed)
+    payloads = []
+    for n, ep in enumerate(episodes):
+        def node(title, year, kind="MOVIE"):
+            return {"node": {"id": f"tm{n}", "objectType": kind,
+                             "content": {"title": title, "originalReleaseYear": year}, "offers": []}}
+        edges = [node(ep["title"], ep["year"] + 25), node(f"{ep['title']} 2", ep["year"] + 3),
+                 node(ep["title"], ep["year"], "SHOW"), node(episodes[(n + 3) % len(episodes)]["title"], 1999),
+                 node(ep["title"], ep["year"])]
+        rng.shuffle(edges)
+        payloads.append(edges)
+    return payloads
+
+
+def _cold(build):
+    """Wrap `build` so each call starts with empty title-normalization caches."""
+    def run():
+        for fn in (title_index.fold, title_index.normalize, title_index.trigrams):
+            fn.cache_clear()
+        return build()
+    return run
+
+
+def build_cases(size):
+    """Return [(case name, item count, zero-arg callable)] for a catalog of `size`."""
+    data = make_catalog(size)
+    episodes = data["episodes"]
+    build_store = _cold(lambda: EpisodeStore(data, path="/dev/null"))
+    items = make_feed_items(episodes)
+    raw_titles = [item.find("title").text for item in items]
+    descriptions = [(item.find("description").text, ep["title"]) for item, ep in zip(items, episodes)]
+    apple = list(zip(episodes, make_apple_results(episodes)))
+    justwatch = list(zip(episodes, make_justwatch_results(episodes)))
+    genres = ["|".join(random.Random(n).sample(_GENRE_LABELS, 3)) for n in range(size)]
+    raw = serialize(data)
+    index = TitleIndex(episodes, key=lambda ep: ep["title"])
+    # Drop a letter from every 100th title, as a near-duplicate feed title would.
+    queries = [ep["title"][:3] + ep["title"][4:] for ep in episodes[::100]]
+
+    fap = fetch_apple_podcast_urls
+    fsa = fetch_streaming_availability
+    return [
+        ("apple.find_best_match", size,
+         lambda: [fap.find_best_match(ep["title"], results, ep["year"]) for ep, results in apple]),
+        ("streaming.find_best_match", size,
+         lambda: [fsa.find_best_match(ep["title"], ep["year"], results) for ep, results in justwatch]),
+        ("parse_title", size,
+         lambda: [fetch_new_episodes.parse_title(t) for t in raw_titles]),
+        ("parse_episode_from_feed", size,
+         lambda: [add_new_episode.parse_episode_from_feed(item) for item in items]),
+        ("extract_year_from_description", size,
+         lambda: [add_new_episode.extract_year_from_description(d, t) for d, t in descriptions]),
+        ("store.build", size, build_store),
+        ("get_stats", size, lambda: streaming_audit.get_stats(build_store())),
+        ("get_stale_movies", size, lambda: streaming_audit.get_stale_movies(episodes, days=30)),
+        ("extract_genres", size, lambda: [enrich_metadata.extract_genres(g) for g in genres]),
+        ("title_index.build", size, _cold(lambda: TitleIndex(episodes, key=lambda ep: ep["title"]))),
+        ("title_index.search", len(queries), lambda: [index.search(q, min_score=0.75) for q in queries]),
+        ("json.load", size, lambda: json.loads(raw)),
+        ("json.dump", size, lambda: serialize(data)),
+    ]
+
+
+def time_case(fn, rounds):
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, rounds, only=None):
+    results = {}
+    for size in sizes:
+        print(f"\n{size:,} episodes")
+        for name, count, fn in build_cases(size):
+            if only and only not in name:
+                continue
+            seconds = time_case(fn, rounds)
+            results[f"{name}@{size}"] = {
+                "case": name,
+                "size": size,
+                "seconds": round(seconds, 6),
+                "perItemUs": round(seconds / count * 1e6, 3),
+            }
+            print(f"  {name:32s} {seconds * 1000:10.2f} ms  {seconds / count * 1e6:9.2f} µs/item")
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Print each case against the baseline; returns the regressed keys."""
+    print(f"\nCompared with baseline from {baseline.get('created', '?')} "
+          f"(regression = more than {threshold:.0%} slower)")
+    regressions = []
+    for key, now in results.items():
+        before = baseline["results"].get(key)
+        if before is None:
+            print(f"  · {key:40s} new")
+            continue
+        ratio = now["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        noisy = max(now["seconds"], before["seconds"]) < min_seconds
+        if ratio > 1 + threshold and not noisy:
+            mark = "✗"
+            regressions.append(key)
+        else:
+            mark = "✓"
+        note = "  (too fast to judge)" if noisy else ""
+        print(f"  {mark} {key:40s} {before['seconds'] * 1000:9.2f} → {now['seconds'] * 1000:9.2f} ms  "
+              f"x{ratio:5.2f}{note}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot paths on synthetic catalogs")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated catalog sizes")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Timed runs per case (best is kept)")
+    parser.add_argument("--only", help="Only run cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="Write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to check this run against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown ratio above which a case counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS,
+                        help="Cases faster than this in both runs are never flagged")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, max(args.rounds, 1), args.only)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "rounds": args.rounds,
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s)")
+            return 1
+        print("\n✓ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
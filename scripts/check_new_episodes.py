@@ -7,93 +7,57 @@ Usage:
     python scripts/check_new_episodes.py --latest  # Show latest from feed
 """
 
-import json
-import re
 import argparse
-import urllib.request
-import xml.etree.ElementTree as ET
-from datetime import datetime
-from pathlib import Path
+from itertools import islice
 
+import feed_parser
+import http_cache
+import metrics
+import podcast_feed
+from episode_store import EpisodeStore
 
-FEED_URL = "https://feeds.megaphone.fm/the-rewatchables"
 
+FEED_URL = podcast_feed.FEED_URL
 
-def fetch_feed():
-    """Fetch and parse the podcast RSS feed."""
-    with urllib.request.urlopen(FEED_URL, timeout=30) as response:
-        xml_data = response.read()
-    return ET.fromstring(xml_data)
 
+def fetch_feed(conditional=True, fingerprint=None):
+    """Open the podcast RSS feed for streaming.
 
-def parse_episodes_from_feed(root, limit=10):
-    """Extract recent episodes from RSS feed."""
+    resp.not_modified is set when the feed is unchanged since the last
+    completed check against a database with the same `fingerprint`;
+    otherwise resp.items() yields <item> elements.
+    """
+    return podcast_feed.fetch(FEED_URL, consumer="check_new_episodes",
+                              conditional=conditional, stream=True, fingerprint=fingerprint)
+
+
+def parse_episodes_from_feed(items, limit=10):
+    """Extract recent episodes from an iterable of RSS <item> elements."""
     episodes = []
-    channel = root.find('channel')
-
-    for item in channel.findall('item')[:limit]:
-        title = item.find('title').text or ""
-        pub_date = item.find('pubDate').text or ""
-        description = item.find('description').text or ""
-
-        # Parse the date
-        try:
-            # Format: "Tue, 03 Dec 2024 10:00:00 -0000"
-            date_obj = datetime.strptime(pub_date[:16], "%a, %d %b %Y")
-            date_str = date_obj.strftime("%Y-%m-%d")
-        except:
-            date_str = pub_date
-
-        # Extract movie title from episode title
-        # Format usually: "Movie Title" With Host Names
-        movie_match = re.match(r'^["\']?([^"\']+)["\']?\s+[Ww]ith', title)
-        if movie_match:
-            movie_title = movie_match.group(1).strip()
-        else:
-            movie_title = title.split(" With")[0].strip().strip('"\'')
-
-        # Extract hosts
-        hosts_match = re.search(r'[Ww]ith\s+(.+)$', title)
-        hosts = []
-        if hosts_match:
-            hosts_str = hosts_match.group(1)
-            # Split by ", and ", " and ", or just ","
-            hosts = re.split(r',\s+and\s+|,\s+|\s+and\s+', hosts_str)
-            hosts = [h.strip() for h in hosts if h.strip()]
+
+    for item in islice(items, limit):
+        parsed = feed_parser.parse_item(item)
+        description = parsed.description
 
         episodes.append({
-            'title': movie_title,
-            'full_title': title,
-            'date': date_str,
-            'hosts': hosts,
+            'title': parsed.movie_title,
+            'full_title': parsed.full_title,
+            'date': parsed.date or item.findtext('pubDate', ''),
+            'hosts': parsed.hosts,
             'description': description[:200] + "..." if len(description) > 200 else description
         })
 
     return episodes
 
 
-def load_database():
-    """Load episodes from database."""
-    script_dir = Path(__file__).parent
-    data_file = script_dir.parent / "src" / "data" / "episodes.json"
-
-    with open(data_file, 'r') as f:
-        data = json.load(f)
-    return data['episodes']
-
-
-def find_missing_episodes(feed_episodes, db_episodes):
+def find_missing_episodes(feed_episodes, store):
     """Find episodes in feed that aren't in database."""
-    # Get all episode dates from database
-    db_dates = set(ep.get('episodeDate', '') for ep in db_episodes)
-    db_titles = set(ep.get('title', '').lower() for ep in db_episodes)
-
     missing = []
     for ep in feed_episodes:
         # Check if this episode date or title exists
-        if ep['date'] not in db_dates:
+        if not store.has_date(ep['date']):
             # Double-check by title
-            if ep['title'].lower() not in db_titles:
+            if not store.has_title(ep['title']):
                 missing.append(ep)
 
     return missing
@@ -103,13 +67,24 @@ def main():
     parser = argparse.ArgumentParser(description='Check for new Rewatchables episodes')
     parser.add_argument('--latest', action='store_true', help='Show latest episode from feed')
     parser.add_argument('--count', type=int, default=10, help='Number of feed episodes to check')
+    http_cache.add_cache_args(parser)
+    metrics.add_metrics_args(parser)
 
     args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("check_new_episodes", args)
+
+    print("Loading database...")
+    store = EpisodeStore.load()
 
     print("Fetching podcast feed...")
     try:
-        root = fetch_feed()
-        feed_episodes = parse_episodes_from_feed(root, limit=args.count)
+        # --latest always needs the feed body, so it never sends validators.
+        resp = fetch_feed(conditional=not args.latest, fingerprint=store.fingerprint())
+        if resp.not_modified:
+            print("\n✓ Feed unchanged since the last check of this database. No new episodes.")
+            return
+        feed_episodes = parse_episodes_from_feed(resp.items(limit=args.count), limit=args.count)
     except Exception as e:
         print(f"Error fetching feed: {e}")
         return
@@ -126,15 +101,13 @@ def main():
         print(f"\nDescription: {ep['description']}")
         return
 
-    print("Loading database...")
-    db_episodes = load_database()
-
-    print(f"Checking {len(feed_episodes)} recent episodes against {len(db_episodes)} in database...")
+    print(f"Checking {len(feed_episodes)} recent episodes against {len(store)} in database...")
 
-    missing = find_missing_episodes(feed_episodes, db_episodes)
+    missing = find_missing_episodes(feed_episodes, store)
 
     if not missing:
         print("\n✓ Database is up to date! No new episodes found.")
+        podcast_feed.remember(resp, store.fingerprint())
     else:
         print(f"\n⚠️  Found {len(missing)} new episode(s) not in database:\n")
         for ep in missing:
@@ -0,0 +1,115 @@
+"""
+Periodic checkpoints and --resume for long per-episode runs.
+
+The lookup scripts used to write episodes.json only at the very end, so a
+crash or Ctrl-C twenty minutes into a --force run lost everything. A
+Checkpoint saves the store every N completed episodes or M seconds
+(whichever comes first) and records the completed episode ids in
+.cache/checkpoints/<script>.json. The store is saved before the progress
+file, and both are replaced atomically (see atomic_file), so the progress
+file never claims work that isn't on disk. An exception (including
+KeyboardInterrupt) inside the `with` block flushes one last checkpoint.
+
+--resume skips the ids the previous run completed; a run that finishes
+normally deletes its checkpoint.
+
+Usage:
+    import checkpoint
+
+    checkpoint.add_checkpoint_args(parser)    # --resume, --checkpoint-every, ...
+    ckpt = checkpoint.from_args("fetch_streaming_availability", args, store.save)
+    with ckpt:
+        for episode in episodes:
+            if episode["id"] in ckpt.done:
+                continue
+            ...
+            ckpt.mark(episode["id"])
+"""
+
+import json
+import time
+
+import http_cache
+from atomic_file import write_atomic
+
+CHECKPOINT_DIR = http_cache.CACHE_DIR / "checkpoints"
+
+DEFAULT_EVERY = 25
+DEFAULT_INTERVAL = 60.0
+
+
+def add_checkpoint_args(parser):
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip episodes completed by the last interrupted run")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_EVERY,
+                        help="Save progress after this many completed episodes")
+    parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Save progress at least this often (seconds)")
+
+
+class Checkpoint:
+    def __init__(self, name, save, every=DEFAULT_EVERY, interval=DEFAULT_INTERVAL):
+        self.name = name
+        self.path = CHECKPOINT_DIR / f"{name}.json"
+        self._save = save
+        self.every = max(every, 1)
+        self.interval = interval
+        self.done = set()
+        self._pending = 0
+        self._last = time.monotonic()
+
+    def resume(self):
+        """Load the ids completed by the previous run; returns how many."""
+        try:
+            with open(self.path) as f:
+                self.done = set(json.load(f).get("done", []))
+        except (OSError, ValueError):
+            self.done = set()
+        return len(self.done)
+
+    def mark(self, episode_id):
+        """Record a completed episode, checkpointing if N episodes or M seconds have passed."""
+        self.done.add(episode_id)
+        self._pending += 1
+        if self._pending >= self.every or time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._save()
+        write_atomic(self.path, json.dumps({
+            "script": self.name,
+            "saved": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "done": sorted(self.done),
+        }, indent=2))
+        self._pending = 0
+        self._last = time.monotonic()
+
+    def finish(self):
+        """The run completed: the checkpoint is no longer needed."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.flush()
+            print(f"\nCheckpoint saved ({len(self.done)} episode(s) done); rerun with --resume to continue.")
+        return False
+
+
+def from_args(name, args, save):
+    """Build a Checkpoint from add_checkpoint_args flags, loading progress under --resume."""
+    ckpt = Checkpoint(name, save, args.checkpoint_every, args.checkpoint_interval)
+    if args.resume:
+        count = ckpt.resume()
+        if count:
+            print(f"Resuming: skipping {count} episode(s) completed by the last run")
+        else:
+            print("No checkpoint found, starting from the beginning")
+    return ckpt
@@ -3,22 +3,49 @@
 Enrich skeleton episodes with metadata from Wikidata.
 
 Free, no signup, no API key. Data is CC0.
-Fills in: year, director, genres, studio for episodes missing that data.
+Fills in: year, director, genres, studio for episodes missing that data, and
+records the chosen film's QID on the episode as "wikidataId".
+
+--refresh-catalog re-pulls year, director and studio for every episode
+straight from Wikidata by stored QID (batched wbgetentities, no Wikipedia
+search); episodes without a QID yet are looked up once first. Curated
+genres are left alone unless --refresh-genres is given, and even then
+genres Wikidata can't express (Sport, Biography, ...) keep their place.
+Each change is printed as old → new; --dry-run prints the report without
+saving.
+
+Episode runs go TITLES_PER_QUERY films at a time and checkpoint
+episodes.json as they go; --resume continues an interrupted run.
+
+Usage:
+    python3 scripts/enrich_metadata.py
+    python3 scripts/enrich_metadata.py --refresh-catalog --dry-run
+    python3 scripts/enrich_metadata.py --refresh-catalog --refresh-genres
+    python3 scripts/enrich_metadata.py --journal
+    python3 scripts/enrich_metadata.py --input-csv movies_to_lookup.csv --output-csv enriched.csv
 """
 
+import argparse
+import csv
 import json
+import os
 import re
-import time
-import urllib.request
 import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 
-EPISODES_PATH = Path(__file__).parent.parent / "src" / "data" / "episodes.json"
-WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
-WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+import checkpoint
+import http_cache
+import http_client
+import metrics
+import patch_journal
+from episode_store import EpisodeStore
+
+WIKIPEDIA_API = os.environ.get("WIKIPEDIA_API", "https://en.wikipedia.org/w/api.php")
+WIKIDATA_API = os.environ.get("WIKIDATA_API", "https://www.wikidata.org/w/api.php")
 
-# Wikimedia requires a descriptive User-Agent with contact info.
-USER_AGENT = "RewatchablesAU/1.0 (https://rewatchables.au; simon@reflive.com)"
 
 # Map Wikidata genre tokens to our genre names. We split multi-word genres
 # (e.g. "crime drama film" → ["crime","drama","film"]) and match each token.
@@ -109,12 +136,15 @@ STUDIO_MAP = {
 def http_get_json(url, params=None, accept="application/json"):
     query = urllib.parse.urlencode(params) if params else ""
     full = f"{url}?{query}" if query else url
-    req = urllib.request.Request(full, headers={
-        "User-Agent": USER_AGENT,
-        "Accept": accept,
-    })
-    with urllib.request.urlopen(req, timeout=20) as r:
-        return json.loads(r.read().decode())
+
+    def download():
+        return http_client.get(full, headers={"Accept": accept}).body
+    return json.loads(http_cache.fetch(full, download).decode())
+
+
+def _chunks(items, size):
+    for n in range(0, len(items), size):
+        yield items[n:n + size]
 
 
 def strip_episode_suffixes(title):
@@ -138,15 +168,82 @@ def find_film_qids(title, year_hint=None, limit=5):
         "gsrsearch": search,
         "gsrlimit": limit,
         "prop": "pageprops",
-        "ppprop": "wikibase_item",
+        "ppprop": "wikibase_item|disambiguation",
     })
     pages = data.get("query", {}).get("pages", {})
     ordered = sorted(pages.values(), key=lambda p: p.get("index", 999))
     out = []
     for page in ordered:
-        qid = page.get("pageprops", {}).get("wikibase_item")
-        if qid:
-            out.append((qid, page.get("title", "")))
+        props = page.get("pageprops", {})
+        if props.get("wikibase_item") and "disambiguation" not in props:
+            out.append((props["wikibase_item"], page.get("title", "")))
+    return out
+
+
+# The Action API accepts at most 50 titles per query.
+TITLES_PER_QUERY = 50
+
+
+def film_page_titles(title, year_hint=None):
+    """Exact Wikipedia page titles to try before falling back to full-text search."""
+    forms = []
+    if year_hint:
+        forms.append(f"{title} ({year_hint} film)")
+    forms.append(f"{title} (film)")
+    return forms
+
+
+def resolve_film_titles(items):
+    """Resolve many films by exact page title, 50 titles per query.
+
+    `items` is a list of (title, year_hint). Tries "Title (YEAR film)" then
+    "Title (film)" for each, following normalization and redirects, and
+    returns one candidate list per item in the (qid, page_title) shape
+    find_film_qids returns. Disambiguation pages are dropped. An empty list
+    means no exact page exists and the caller should fall back to search.
+    """
+    forms_per_item = [film_page_titles(title, year) for title, year in items]
+    # "|" is the multi-value separator, so such titles can't be batched.
+    wanted = list(dict.fromkeys(t for forms in forms_per_item for t in forms if "|" not in t))
+
+    resolved = {}
+    for chunk in _chunks(wanted, TITLES_PER_QUERY):
+        data = http_get_json(WIKIPEDIA_API, {
+            "action": "query",
+            "format": "json",
+            "titles": "|".join(chunk),
+            "redirects": 1,
+            "prop": "pageprops",
+            "ppprop": "wikibase_item|disambiguation",
+        })
+        query = data.get("query", {})
+        aliases = {e["from"]: e["to"] for e in query.get("normalized", []) + query.get("redirects", [])}
+        qids = {
+            page["title"]: page["pageprops"]["wikibase_item"]
+            for page in query.get("pages", {}).values()
+            if "wikibase_item" in page.get("pageprops", {})
+            and "disambiguation" not in page.get("pageprops", {})
+        }
+        for requested in chunk:
+            final = requested
+            # normalized → redirect → (rarely) a second redirect
+            for _ in range(3):
+                if final not in aliases:
+                    break
+                final = aliases[final]
+            if final in qids:
+                resolved[requested] = (qids[final], final)
+
+    out = []
+    for forms in forms_per_item:
+        seen = set()
+        candidates = []
+        for form in forms:
+            hit = resolved.get(form)
+            if hit and hit[0] not in seen:
+                seen.add(hit[0])
+                candidates.append(hit)
+        out.append(candidates)
     return out
 
 
@@ -176,58 +273,107 @@ def _claim_times(claims, prop):
     return out
 
 
+# wbgetentities accepts at most 50 ids per request.
+WBGETENTITIES_MAX_IDS = 50
+
+
 def fetch_labels(qids):
     """Batch-resolve English labels for a list of item QIDs via wbgetentities."""
-    if not qids:
-        return {}
-    data = http_get_json(WIKIDATA_API, {
-        "action": "wbgetentities",
-        "ids": "|".join(qids),
-        "props": "labels",
-        "languages": "en",
-        "format": "json",
-    })
     labels = {}
-    for entity_qid, entity in data.get("entities", {}).items():
-        label = entity.get("labels", {}).get("en", {}).get("value")
-        if label:
-            labels[entity_qid] = label
+    for chunk in _chunks(list(dict.fromkeys(qids)), WBGETENTITIES_MAX_IDS):
+        data = http_get_json(WIKIDATA_API, {
+            "action": "wbgetentities",
+            "ids": "|".join(chunk),
+            "props": "labels",
+            "languages": "en",
+            "format": "json",
+        })
+        for entity_qid, entity in data.get("entities", {}).items():
+            label = entity.get("labels", {}).get("en", {}).get("value")
+            if label:
+                labels[entity_qid] = label
     return labels
 
 
+def fetch_claims(qids):
+    """Batch-fetch claims for many items, 50 ids per wbgetentities call.
+
+    Returns {qid: claims}; items that are missing or have no claims are omitted.
+    """
+    claims_by_qid = {}
+    for chunk in _chunks(list(dict.fromkeys(qids)), WBGETENTITIES_MAX_IDS):
+        data = http_get_json(WIKIDATA_API, {
+            "action": "wbgetentities",
+            "ids": "|".join(chunk),
+            "props": "claims",
+            "format": "json",
+        })
+        for entity_qid, entity in data.get("entities", {}).items():
+            if "claims" in entity:
+                claims_by_qid[entity_qid] = entity["claims"]
+    return claims_by_qid
+
+
+def _referenced_qids(claims):
+    """QIDs whose labels are needed to summarize a film's claims."""
+    return (_claim_qids(claims, PROP_DIRECTOR) + _claim_qids(claims, PROP_GENRE)
+            + _claim_qids(claims, PROP_PRODUCTION) + _claim_qids(claims, PROP_DISTRIBUTOR))
+
+
+def summarize_claims(claims, labels):
+    """Reduce a film's claims to the pipe-joined fields the extract_* helpers expect."""
+    def joined_labels(prop):
+        return "|".join(labels[q] for q in _claim_qids(claims, prop) if q in labels)
+
+    return {
+        "pubDates": "|".join(_claim_times(claims, PROP_PUBLICATION_DATE)),
+        "directors": joined_labels(PROP_DIRECTOR),
+        "genres": joined_labels(PROP_GENRE),
+        "productions": joined_labels(PROP_PRODUCTION),
+        "distributors": joined_labels(PROP_DISTRIBUTOR),
+    }
+
+
 def fetch_wikidata(qid):
     """Fetch a film's year, directors, genres, production, and distribution via the
     Wikidata Action API (wbgetentities) — not the SPARQL query service (WDQS), which
     is prone to prolonged outages with an aggressive, hard-to-predict rate limiter."""
-    data = http_get_json(WIKIDATA_API, {
-        "action": "wbgetentities",
-        "ids": qid,
-        "props": "claims",
-        "format": "json",
-    })
-    entity = data.get("entities", {}).get(qid)
-    if not entity or "claims" not in entity:
-        return None
-    claims = entity["claims"]
+    return fetch_wikidata_batch([qid]).get(qid)
 
-    director_qids = _claim_qids(claims, PROP_DIRECTOR)
-    genre_qids = _claim_qids(claims, PROP_GENRE)
-    production_qids = _claim_qids(claims, PROP_PRODUCTION)
-    distributor_qids = _claim_qids(claims, PROP_DISTRIBUTOR)
 
-    all_qids = list(dict.fromkeys(director_qids + genre_qids + production_qids + distributor_qids))
-    labels = fetch_labels(all_qids)
+def fetch_wikidata_batch(qids):
+    """fetch_wikidata for many films at once: {qid: summary}.
 
-    def joined_labels(qids):
-        return "|".join(labels[q] for q in qids if q in labels)
+    Claims for every film come back in ceil(n/50) requests, then the labels
+    for every director/genre/studio they reference are resolved in one
+    deduplicated pass, so the request count no longer scales with films x
+    candidates.
+    """
+    claims_by_qid = fetch_claims(qids)
+    labels = fetch_labels([q for claims in claims_by_qid.values() for q in _referenced_qids(claims)])
+    return {qid: summarize_claims(claims, labels) for qid, claims in claims_by_qid.items()}
 
-    return {
-        "pubDates": "|".join(_claim_times(claims, PROP_PUBLICATION_DATE)),
-        "directors": joined_labels(director_qids),
-        "genres": joined_labels(genre_qids),
-        "productions": joined_labels(production_qids),
-        "distributors": joined_labels(distributor_qids),
-    }
+
+def choose_candidate(candidates, wd_by_qid, year_hint=None, strict=False):
+    """Pick (qid, page, wd) from search candidates, or None.
+
+    Prefers the candidate whose Wikidata year matches the hint; with no hint
+    (or no match), falls back to the first candidate that returned data.
+    With `strict`, a hint that no candidate matches returns None instead.
+    """
+    fallback = None
+    for cand_qid, cand_page in candidates:
+        cand_wd = wd_by_qid.get(cand_qid)
+        if not cand_wd:
+            continue
+        if fallback is None:
+            fallback = (cand_qid, cand_page, cand_wd)
+        if not year_hint:
+            return fallback
+        cand_year = extract_year(cand_wd["pubDates"])
+        if cand_year and abs(cand_year - year_hint) <= 1:
+            return cand_qid, cand_page, cand_wd
+    return None if strict and year_hint else fallback
 
 
 def extract_year(pub_dates_str):
@@ -248,8 +394,8 @@ def extract_directors(directors_str):
     return ", ".join(names)
 
 
-def extract_genres(genres_str):
-    """Map Wikidata genre phrases to our genre set, capped to MAX_GENRES by priority."""
+def _mapped_genres(genres_str):
+    """Every GENRE_MAP genre the Wikidata phrases mention, in GENRE_PRIORITY order."""
     if not genres_str:
         return []
     matched = set()
@@ -258,8 +404,29 @@ def extract_genres(genres_str):
         for token in phrase.split():
             if token in GENRE_MAP:
                 matched.add(GENRE_MAP[token])
-    ordered = [g for g in GENRE_PRIORITY if g in matched]
-    return ordered[:MAX_GENRES]
+    return [g for g in GENRE_PRIORITY if g in matched]
+
+
+def extract_genres(genres_str):
+    """Map Wikidata genre phrases to our genre set, capped to MAX_GENRES by priority."""
+    return _mapped_genres(genres_str)[:MAX_GENRES]
+
+
+def merge_genres(existing, genres_str):
+    """Refresh a curated genre list from Wikidata without losing curation.
+
+    Genres GENRE_MAP can't produce ("Sport", "Biography", ...) are kept, as
+    are mapped ones Wikidata still lists, all in their existing order; mapped
+    genres Wikidata no longer lists are dropped, and new ones are appended in
+    priority order while the list is under MAX_GENRES.
+    """
+    mapped = _mapped_genres(genres_str)
+    known = set(GENRE_MAP.values())
+    merged = [g for g in existing if g not in known or g in mapped]
+    for genre in mapped:
+        if genre not in merged and len(merged) < MAX_GENRES:
+            merged.append(genre)
+    return merged
 
 
 def extract_studio(productions_str, distributors_str):
@@ -274,6 +441,36 @@ def extract_studio(productions_str, distributors_str):
     return ""
 
 
+def apply_metadata(store, episode, wd, qid=None):
+    """Write year/director/genres/studio from a Wikidata summary onto the episode.
+
+    Only non-empty values are written; `qid` is stored as wikidataId so later
+    refreshes can skip the search. Returns "key=value" strings for logging.
+    """
+    year = extract_year(wd["pubDates"])
+    director = extract_directors(wd["directors"])
+    genres = extract_genres(wd["genres"])
+    studio = extract_studio(wd["productions"], wd["distributors"])
+
+    if year:
+        store.set_field(episode, "year", year)
+    if director:
+        store.set_field(episode, "director", director)
+    if genres:
+        store.set_field(episode, "genres", genres)
+    if studio:
+        store.set_field(episode, "studio", studio)
+    if qid:
+        store.set_field(episode, "wikidataId", qid)
+
+    parts = []
+    if year: parts.append(f"year={year}")
+    if director: parts.append(f"dir={director}")
+    if genres: parts.append(f"genres={','.join(genres)}")
+    if studio: parts.append(f"studio={studio}")
+    return parts
+
+
 def is_skeleton(episode):
     return (
         not episode.get("year")
@@ -282,101 +479,328 @@ def is_skeleton(episode):
     )
 
 
-def main():
-    with open(EPISODES_PATH) as f:
-        data = json.load(f)
+# Returned by lookup_films for an item whose lookup hit a network/API error,
+# as distinct from None (searched fine, no matching film).
+LOOKUP_FAILED = "lookup-failed"
 
-    skeletons = [(i, ep) for i, ep in enumerate(data["episodes"]) if is_skeleton(ep)]
 
-    if not skeletons:
-        print("✓ No skeleton episodes to enrich")
-        return 0
+def lookup_films(items, workers=1):
+    """Resolve and fetch metadata for many films with as few requests as possible.
 
-    print(f"Found {len(skeletons)} skeleton episode(s) to enrich\n")
-    updated = 0
-    not_found = 0
+    `items` is a list of (label, search_title, year_hint). Returns one entry
+    per item, in order: a (qid, page, wd) tuple, None if no film was found,
+    or LOOKUP_FAILED if a request errored (worth retrying later).
+    """
+    # Step 1: exact "Title (YEAR film)" / "Title (film)" lookups, 50 titles
+    # per query; only misses fall back to a full-text search each.
+    try:
+        candidate_lists = resolve_film_titles([(title, year) for _, title, year in items])
+    except Exception as e:
+        print(f"  ✗ Title lookup error, searching instead: {e}")
+        candidate_lists = [[] for _ in items]
+
+    # Step 2: claims for every exact hit in a handful of batched requests.
+    # An exact page only counts when its year agrees with the hint: "Title
+    # (film)" is often the original of a remake, and the year-biased search
+    # below finds the right one.
+    exact_qids = [qid for cands in candidate_lists for qid, _ in cands]
+    try:
+        wd_by_qid = fetch_wikidata_batch(exact_qids) if exact_qids else {}
+    except Exception as e:
+        print(f"  ✗ Wikidata error: {e}")
+        return [LOOKUP_FAILED] * len(items)
+
+    results = [None] * len(items)
+    misses = []
+    for n, (label, _, year) in enumerate(items):
+        pick = choose_candidate(candidate_lists[n], wd_by_qid, year_hint=year, strict=True)
+        if pick:
+            print(f"  Resolved: {label} → {pick[1]}")
+            results[n] = pick
+        else:
+            misses.append(n)
+
+    # Searches share http_client's adaptive per-host rate limit.
+    def search(n):
+        _, title, year = items[n]
+        try:
+            return find_film_qids(title, year_hint=year)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        searched = dict(zip(misses, pool.map(search, misses)))
+
+    for n in misses:
+        label, title, year = items[n]
+        hint_label = f", year={year}" if year else ""
+        shown = f"{label} (as \"{title}\"{hint_label})" if title != label or year else label
+        print(f"  Searching: {shown}")
+        found = searched[n]
+        candidate_lists[n] = []
+        if isinstance(found, Exception):
+            print(f"  ✗ Error: {found}")
+            results[n] = LOOKUP_FAILED
+        elif not found:
+            print(f"  ✗ No Wikipedia film page found")
+        else:
+            candidate_lists[n] = found
+
+    # Step 3: claims for the searched candidates not already fetched, then
+    # all referenced labels in one deduplicated pass.
+    new_qids = [qid for n in misses for qid, _ in candidate_lists[n] if qid not in wd_by_qid]
+    print(f"\nFetching Wikidata for {len(set(new_qids))} candidate film(s)...\n")
+    try:
+        if new_qids:
+            wd_by_qid.update(fetch_wikidata_batch(new_qids))
+    except Exception as e:
+        print(f"  ✗ Wikidata error: {e}")
+        return [LOOKUP_FAILED if n in misses and candidate_lists[n] else r
+                for n, r in enumerate(results)]
+
+    # Step 4: pick a candidate per searched item locally.
+    for n in misses:
+        label, _, year = items[n]
+        if results[n] is not None or not candidate_lists[n]:
+            continue
+        results[n] = choose_candidate(candidate_lists[n], wd_by_qid, year_hint=year)
+        if results[n] is None:
+            print(f"  ✗ {label}: Wikidata returned no data for any candidate")
+    return results
 
-    for idx, episode in skeletons:
-        title = episode["title"]
-        search_title = strip_episode_suffixes(title)
-        year_hint = episode.get("year")
-        hint_label = f", year={year_hint}" if year_hint else ""
-        label = f"{title} (as \"{search_title}\"{hint_label})" if search_title != title or year_hint else title
-        print(f"  Searching: {label}")
 
-        try:
-            candidates = find_film_qids(search_title, year_hint=year_hint)
-            if not candidates:
-                print(f"  ✗ No Wikipedia film page found")
-                not_found += 1
-                time.sleep(0.5)
-                continue
+# "title" and "year" are echoed from the input row (they key resumption);
+# "releaseYear" is what Wikidata says.
+CSV_FIELDS = ["title", "year", "director", "genres", "studio", "releaseYear", "wikidataId", "status"]
+
+
+def _csv_key(row):
+    return (row.get("title", "").strip(), (row.get("year") or "").strip())
 
-            # Walk candidates and prefer the one whose Wikidata year matches the hint.
-            # If no hint or no match, fall back to the first candidate that returns data.
-            qid = page = wd = None
-            fallback = None
-            for cand_qid, cand_page in candidates:
-                time.sleep(0.3)
-                cand_wd = fetch_wikidata(cand_qid)
-                if not cand_wd:
-                    continue
-                if fallback is None:
-                    fallback = (cand_qid, cand_page, cand_wd)
-                if year_hint:
-                    cand_year = extract_year(cand_wd["pubDates"])
-                    if cand_year and abs(cand_year - year_hint) <= 1:
-                        qid, page, wd = cand_qid, cand_page, cand_wd
-                        break
-                else:
-                    qid, page, wd = cand_qid, cand_page, cand_wd
-                    break
 
-            if wd is None and fallback is not None:
-                qid, page, wd = fallback
+def enrich_csv(input_path, output_path, batch_size=50, workers=4):
+    """Stream rows from a title/year CSV through the lookup pipeline.
 
+    Results are appended to `output_path` and flushed batch by batch, so
+    progress is visible while the job runs. Rows already present in the
+    output (found or not found) are skipped, so an interrupted job resumes
+    where it stopped; rows that hit a request error are left out and get
+    retried on the next run.
+    """
+    done = set()
+    if output_path.exists():
+        with open(output_path, newline="") as f:
+            done = {_csv_key(row) for row in csv.DictReader(f)}
+
+    with open(input_path, newline="") as src:
+        pending = (row for row in csv.DictReader(src) if _csv_key(row) not in done)
+        write_header = not output_path.exists() or output_path.stat().st_size == 0
+        with open(output_path, "a", newline="") as out:
+            writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+            if write_header:
+                writer.writeheader()
+
+            found = missing = failed = 0
+            while True:
+                batch = list(islice(pending, batch_size))
+                if not batch:
+                    break
+                items = []
+                for row in batch:
+                    title = row["title"].strip()
+                    year = (row.get("year") or "").strip()
+                    items.append((title, strip_episode_suffixes(title), int(year) if year.isdigit() else None))
+
+                for row, (title, _, _), result in zip(batch, items, lookup_films(items, workers)):
+                    if result == LOOKUP_FAILED:
+                        failed += 1
+                        continue
+                    key = _csv_key(row)
+                    if key in done:
+                        continue  # duplicate row in the input
+                    done.add(key)
+                    out_row = {"title": title, "year": key[1], "status": "not_found"}
+                    if result:
+                        qid, _, wd = result
+                        genres = extract_genres(wd["genres"])
+                        out_row.update({
+                            "releaseYear": extract_year(wd["pubDates"]) or "",
+                            "director": extract_directors(wd["directors"]),
+                            "genres": ", ".join(genres),
+                            "studio": extract_studio(wd["productions"], wd["distributors"]),
+                            "wikidataId": qid,
+                            "status": "found",
+                        })
+                        found += 1
+                    else:
+                        missing += 1
+                    writer.writerow(out_row)
+                out.flush()
+                print(f"--- {len(done)} row(s) written to {output_path} ---\n")
+
+    print(f"Found: {found}")
+    print(f"Not found: {missing}")
+    print(f"Failed (will retry on next run): {failed}")
+    return 1 if failed else 0
+
+
+def _lookup_items(episodes):
+    return [(ep["title"], strip_episode_suffixes(ep["title"]), ep.get("year")) for ep in episodes]
+
+
+def refreshed_fields(episode, wd, genres=False):
+    """{field: (old, new)} for the metadata a refresh would change on the episode.
+
+    Like apply_metadata, empty Wikidata values never overwrite; genres are
+    only touched with `genres`, and then merged (merge_genres), not replaced.
+    """
+    new = {
+        "year": extract_year(wd["pubDates"]),
+        "director": extract_directors(wd["directors"]),
+        "studio": extract_studio(wd["productions"], wd["distributors"]),
+    }
+    if genres and wd["genres"]:
+        new["genres"] = merge_genres(episode.get("genres") or [], wd["genres"])
+    return {field: (episode.get(field), value) for field, value in new.items()
+            if value and value != episode.get(field)}
+
+
+def refresh_catalog(store, ckpt, save, workers=1, genres=False, dry_run=False):
+    """Re-pull year/director/studio (and genres, if asked) for every episode by stored QID."""
+    missing = [ep for ep in store if not ep.get("wikidataId") and ep["id"] not in ckpt.done]
+    if missing:
+        print(f"Looking up QIDs for {len(missing)} episode(s) without one...\n")
+    for chunk in _chunks(missing, TITLES_PER_QUERY):
+        found = False
+        for episode, result in zip(chunk, lookup_films(_lookup_items(chunk), workers)):
+            if result and result != LOOKUP_FAILED:
+                store.set_field(episode, "wikidataId", result[0])
+                found = True
+        # Keep QIDs as they're found so an interrupted run doesn't search again.
+        if found and not dry_run:
+            save()
+
+    with_qid = [ep for ep in store if ep.get("wikidataId") and ep["id"] not in ckpt.done]
+    print(f"\nRefreshing {len(with_qid)} episode(s) from Wikidata by QID...\n")
+    try:
+        wd_by_qid = fetch_wikidata_batch([ep["wikidataId"] for ep in with_qid])
+    except Exception as e:
+        print(f"  ✗ Wikidata error: {e}")
+        return 1
+
+    changed = unchanged = 0
+    by_field = Counter()
+    with ckpt:
+        for episode in with_qid:
+            wd = wd_by_qid.get(episode["wikidataId"])
             if not wd:
-                print(f"  ✗ Wikidata returned no data for any candidate")
-                not_found += 1
-                time.sleep(0.5)
+                print(f"  ✗ {episode['title']}: no Wikidata data for {episode['wikidataId']}")
                 continue
+            changes = refreshed_fields(episode, wd, genres)
+            if changes:
+                diff = "; ".join(f"{field}: {old!r} → {new!r}" for field, (old, new) in changes.items())
+                print(f"  ✓ {episode['title']} [{episode['wikidataId']}] — {diff}")
+                by_field.update(changes.keys())
+                changed += 1
+            else:
+                unchanged += 1
+            if dry_run:
+                continue
+            for field, (_, new) in changes.items():
+                store.set_field(episode, field, new)
+            ckpt.mark(episode["id"])
 
-            year = extract_year(wd["pubDates"])
-            director = extract_directors(wd["directors"])
-            genres = extract_genres(wd["genres"])
-            studio = extract_studio(wd["productions"], wd["distributors"])
-
-            if year:
-                data["episodes"][idx]["year"] = year
-            if director:
-                data["episodes"][idx]["director"] = director
-            if genres:
-                data["episodes"][idx]["genres"] = genres
-            if studio:
-                data["episodes"][idx]["studio"] = studio
-
-            parts = []
-            if year: parts.append(f"year={year}")
-            if director: parts.append(f"dir={director}")
-            if genres: parts.append(f"genres={','.join(genres)}")
-            if studio: parts.append(f"studio={studio}")
-            print(f"  ✓ {title} → {page} [{qid}] — {', '.join(parts)}")
-            updated += 1
+    fields = ", ".join(f"{field} {count}" for field, count in by_field.most_common())
+    print(f"\nChanged: {changed}" + (f" ({fields})" if fields else ""))
+    print(f"Unchanged: {unchanged}")
+    print(f"Without QID: {len(store) - len(with_qid)}")
+
+    if dry_run:
+        print("[DRY RUN] No changes made")
+        return 0
+    if changed or missing:
+        save()
+        print("Done!")
+    ckpt.finish()
+    return 0
 
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            not_found += 1
 
-        time.sleep(0.5)
+def main():
+    parser = argparse.ArgumentParser(description="Enrich skeleton episodes with Wikidata metadata")
+    parser.add_argument("--input-csv", type=Path,
+                        help="Enrich a title/year CSV (e.g. movies_to_lookup.csv) instead of episodes.json")
+    parser.add_argument("--output-csv", type=Path,
+                        help="Where --input-csv results are appended; rerun to resume")
+    parser.add_argument("--batch-size", type=int, default=TITLES_PER_QUERY,
+                        help="Rows looked up together in --input-csv mode")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent Wikipedia searches for titles without an exact page")
+    parser.add_argument("--refresh-catalog", action="store_true",
+                        help="Re-pull metadata for every episode by stored Wikidata QID")
+    parser.add_argument("--refresh-genres", action="store_true",
+                        help="With --refresh-catalog, also merge Wikidata genres into curated ones")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="With --refresh-catalog, print what would change without saving")
+    http_cache.add_cache_args(parser)
+    checkpoint.add_checkpoint_args(parser)
+    patch_journal.add_journal_args(parser)
+    metrics.add_metrics_args(parser)
+    args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("enrich_metadata", args)
+
+    if (args.refresh_genres or args.dry_run) and not args.refresh_catalog:
+        parser.error("--refresh-genres and --dry-run only apply to --refresh-catalog")
+
+    if args.input_csv:
+        if not args.output_csv:
+            parser.error("--input-csv requires --output-csv")
+        with metrics.stage("lookup"):
+            return enrich_csv(args.input_csv, args.output_csv, max(args.batch_size, 1), args.workers)
+
+    store = EpisodeStore.load()
+
+    name = "enrich_metadata_refresh" if args.refresh_catalog else "enrich_metadata"
+    save = patch_journal.saver(store, args, name)
+    ckpt = checkpoint.from_args(name, args, save)
+
+    if args.refresh_catalog:
+        with metrics.stage("lookup"):
+            return refresh_catalog(store, ckpt, save, args.workers,
+                                   genres=args.refresh_genres, dry_run=args.dry_run)
+
+    skeletons = [ep for ep in store if is_skeleton(ep) and ep["id"] not in ckpt.done]
+
+    if not skeletons:
+        print("✓ No skeleton episodes to enrich")
+        return 0
+
+    print(f"Found {len(skeletons)} skeleton episode(s) to enrich\n")
+    updated = 0
+    not_found = 0
+
+    with metrics.stage("lookup"), ckpt:
+        for chunk in _chunks(skeletons, TITLES_PER_QUERY):
+            for episode, result in zip(chunk, lookup_films(_lookup_items(chunk), args.workers)):
+                if result == LOOKUP_FAILED:
+                    not_found += 1
+                    continue  # not marked done: retried on --resume
+                if result:
+                    qid, page, wd = result
+                    parts = apply_metadata(store, episode, wd, qid)
+                    print(f"  ✓ {episode['title']} → {page} [{qid}] — {', '.join(parts)}")
+                    updated += 1
+                else:
+                    not_found += 1
+                ckpt.mark(episode["id"])
 
     print(f"\nUpdated: {updated}")
     print(f"Not found: {not_found}")
 
     if updated > 0:
-        with open(EPISODES_PATH, "w") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-            f.write("\n")
+        save()
         print("Done!")
+    ckpt.finish()
 
     if not_found > 0:
         print(f"\n⚠️  {not_found} episode(s) failed enrichment")
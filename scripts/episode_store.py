@@ -0,0 +1,366 @@
+"""
+Shared, indexed access to src/data/episodes.json (or the file named by
+the EPISODES_PATH environment variable).
+
+Every pipeline script loads the database through EpisodeStore, which parses
+the file once and keeps hash indexes by id, normalized title, episodeDate,
+studio and streaming service. Lookups and dedupe checks are O(1) dict hits
+instead of a linear scan over the whole catalog. Titles are keyed with
+title_index.normalize, the same normalization the JustWatch and Apple
+matchers use; similar_titles() ranks near-identical titles for dedupe hints.
+
+Saves are compare-and-swap: under an advisory lock, the file is re-read
+and its hash compared with the one loaded. If another stage saved in the
+meantime, this store's own field changes and inserts are replayed on top
+of that newer content instead of overwriting it; the same field changed
+to different values by both raises ConflictError. Writes go through
+atomic_file, so a crash never truncates the database.
+
+Every save produces the same canonical bytes (serialize()): fixed field
+order, UTF-8 without \\u escapes, two-space indent and a trailing newline.
+Whichever script writes last no longer re-encodes the whole file, and a
+save whose bytes match what's on disk is skipped entirely.
+
+Usage:
+    from episode_store import EpisodeStore
+
+    store = EpisodeStore.load()
+    if not store.has_title("Heat"):
+        ...
+    store.set_field(store.get("heat"), "year", 1995)
+    store.save()
+"""
+
+import copy
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import metrics
+from atomic_file import locked, write_atomic
+from title_index import TitleIndex, normalize
+
+EPISODES_PATH = Path(os.environ.get("EPISODES_PATH")
+                     or Path(__file__).parent.parent / "src" / "data" / "episodes.json")
+
+# Subscription services stored as booleans in each episode's `streaming` dict.
+# `rentBuy` is a list of storefront names and is not indexed.
+STREAMING_SERVICES = [
+    "netflix", "stan", "primeVideo", "disneyPlus", "binge", "paramount", "appleTv", "hboMax",
+]
+
+# Canonical field order in episodes.json. Fields not listed here follow,
+# sorted by name.
+EPISODE_FIELDS = [
+    "id", "title", "year", "director", "episodeDate", "spotifyUrl", "applePodcastsUrl",
+    "hosts", "guests", "genres", "streaming", "lastStreamingCheck", "communityRating",
+    "editorPick", "studio", "wikidataId", "justwatchId",
+]
+STREAMING_FIELDS = STREAMING_SERVICES + ["rentBuy"]
+
+# Fields that feed an index; changing one through set_field re-indexes the episode.
+_INDEXED_FIELDS = {"id", "title", "episodeDate", "studio", "streaming"}
+
+
+class ConflictError(Exception):
+    """Another writer changed a field this store also changed, to a different value."""
+
+
+_MISSING = object()
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _ordered(mapping, order):
+    out = {key: mapping[key] for key in order if key in mapping}
+    for key in sorted(mapping):
+        if key not in out:
+            out[key] = mapping[key]
+    return out
+
+
+def canonical_episode(episode):
+    """Copy of `episode` with its fields (and streaming flags) in canonical order."""
+    episode = _ordered(episode, EPISODE_FIELDS)
+    if isinstance(episode.get("streaming"), dict):
+        episode["streaming"] = _ordered(episode["streaming"], STREAMING_FIELDS)
+    return episode
+
+
+def serialize(data):
+    """Canonical UTF-8 bytes for an episodes database."""
+    out = {key: value for key, value in data.items() if key != "episodes"}
+    out = {"episodes": [canonical_episode(ep) for ep in data["episodes"]], **out}
+    return (json.dumps(out, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def has_streaming(streaming):
+    """True if any subscription service is flagged or rent/buy storefronts are listed."""
+    streaming = streaming or {}
+    return any(streaming.get(k) for k in STREAMING_SERVICES) or bool(streaming.get("rentBuy"))
+
+
+class EpisodeStore:
+    """In-memory episodes database with hash indexes over the common lookup keys."""
+
+    def __init__(self, data, path=EPISODES_PATH, digest=None):
+        self.path = Path(path)
+        self.data = data
+        # Hash of the file contents this store was loaded from (or last
+        # saved), and the edits made since — what save() needs to rebase.
+        self._digest = digest
+        self._changes = {}    # (id, field) -> (old value, new value)
+        self._inserted = []   # (index, id) in insertion order
+        self._reindex()
+
+    @classmethod
+    def load(cls, path=EPISODES_PATH):
+        with metrics.stage("store.load"):
+            with open(path, "rb") as f:
+                raw = f.read()
+            return cls(json.loads(raw), path, _digest(raw))
+
+    @property
+    def episodes(self):
+        return self.data["episodes"]
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def __iter__(self):
+        return iter(self.episodes)
+
+    # --- Indexes -----------------------------------------------------------
+
+    def _reindex(self):
+        self._by_id = {}
+        self._by_title = {}
+        self._by_date = {}
+        self._by_studio = {}
+        self._by_service = {s: {} for s in STREAMING_SERVICES}
+        self._titles = None
+        for ep in self.episodes:
+            self._index(ep)
+
+    @staticmethod
+    def _keys(ep):
+        streaming = ep.get("streaming") or {}
+        return (
+            normalize(ep.get("title")),
+            ep.get("episodeDate", ""),
+            # Same label streaming_audit has always used for a missing studio.
+            ep.get("studio", "unknown"),
+            [s for s in STREAMING_SERVICES if streaming.get(s)],
+        )
+
+    def _index(self, ep):
+        # Secondary indexes are keyed by id so removal is O(1) as well.
+        title, date, studio, services = self._keys(ep)
+        self._titles = None
+        self._by_id[ep["id"]] = ep
+        self._by_title.setdefault(title, {})[ep["id"]] = ep
+        self._by_date.setdefault(date, {})[ep["id"]] = ep
+        self._by_studio.setdefault(studio, {})[ep["id"]] = ep
+        for service in services:
+            self._by_service[service][ep["id"]] = ep
+
+    def _unindex(self, ep):
+        title, date, studio, services = self._keys(ep)
+        self._titles = None
+        self._by_id.pop(ep["id"], None)
+        for index, key in ((self._by_title, title), (self._by_date, date), (self._by_studio, studio)):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(ep["id"], None)
+                if not bucket:
+                    del index[key]
+        for service in services:
+            self._by_service[service].pop(ep["id"], None)
+
+    # --- Lookups -----------------------------------------------------------
+
+    def get(self, episode_id):
+        return self._by_id.get(episode_id)
+
+    def find_by_title(self, title):
+        return list(self._by_title.get(normalize(title), {}).values())
+
+    def find_by_date(self, date):
+        return list(self._by_date.get(date, {}).values())
+
+    def find_by_studio(self, studio):
+        return list(self._by_studio.get(studio, {}).values())
+
+    def find_by_service(self, service):
+        return list(self._by_service.get(service, {}).values())
+
+    def has_id(self, episode_id):
+        return episode_id in self._by_id
+
+    def has_title(self, title):
+        return normalize(title) in self._by_title
+
+    def similar_titles(self, title, min_score=0.75, limit=3):
+        """(score, episode) pairs whose titles are close to `title`, best first.
+
+        The trigram index is built on first use and dropped whenever an
+        episode is re-indexed.
+        """
+        if self._titles is None:
+            self._titles = TitleIndex(self.episodes, key=lambda ep: ep.get("title"))
+        return self._titles.search(title, limit=limit, min_score=min_score)
+
+    def has_date(self, date):
+        return date in self._by_date
+
+    def fingerprint(self):
+        """Cheap summary of which episodes exist: the count plus the ids on the newest episodeDate.
+
+        Adding an episode, or reverting/restoring the file to an older
+        state, changes it; field edits by the enrichment stages don't.
+        """
+        newest = max(self._by_date, default="")
+        return f"{len(self)}:{newest}:{','.join(sorted(self._by_date.get(newest, {})))}"
+
+    def studios(self):
+        """Map of studio slug → episode count."""
+        return {studio: len(eps) for studio, eps in self._by_studio.items()}
+
+    def service_counts(self):
+        """Map of subscription service key → number of episodes flagged for it."""
+        return {service: len(eps) for service, eps in self._by_service.items()}
+
+    # --- Mutation ----------------------------------------------------------
+
+    def insert(self, episode, index=0):
+        """Insert a new episode (at the top of the list by default) and index it."""
+        if episode["id"] in self._by_id:
+            raise ValueError(f"Duplicate episode id: {episode['id']}")
+        self.episodes.insert(index, episode)
+        self._index(episode)
+        self._inserted.append((index, episode["id"]))
+
+    def set_field(self, episode, field, value):
+        """Set a top-level field on an episode, keeping the indexes in sync."""
+        key = (episode["id"], field)
+        if key in self._changes:
+            old = self._changes[key][0]
+        else:
+            old = copy.deepcopy(episode[field]) if field in episode else _MISSING
+        if old == value:
+            self._changes.pop(key, None)
+        else:
+            self._changes[key] = (old, copy.deepcopy(value))
+
+        if field in _INDEXED_FIELDS:
+            self._unindex(episode)
+            episode[field] = value
+            self._index(episode)
+        else:
+            episode[field] = value
+
+    def take_patches(self):
+        """Return edits made since the last save as patch_journal records, and forget them.
+
+        Inserted episodes are recorded whole (including later field edits);
+        "old" is omitted for fields that didn't exist before.
+        """
+        inserted = {episode_id for _, episode_id in self._inserted}
+        patches = [
+            {"op": "insert", "id": episode_id, "index": index, "episode": copy.deepcopy(self._by_id[episode_id])}
+            for index, episode_id in self._inserted if episode_id in self._by_id
+        ]
+        for (episode_id, field), (old, new) in self._changes.items():
+            if episode_id in inserted:
+                continue
+            patch = {"op": "set", "id": episode_id, "field": field}
+            if old is not _MISSING:
+                patch["old"] = old
+            patch["new"] = new
+            patches.append(patch)
+        self._changes = {}
+        self._inserted = []
+        return patches
+
+    # --- Persistence -------------------------------------------------------
+
+    def save(self):
+        """Write the store back, rebasing onto any save made since it was loaded.
+
+        Returns False (and touches nothing) if the canonical bytes already
+        match the file.
+        """
+        with metrics.stage("store.save"), locked(self.path):
+            try:
+                current = self.path.read_bytes()
+            except FileNotFoundError:
+                current = None
+            if current is not None and self._digest is not None and _digest(current) != self._digest:
+                self._rebase(json.loads(current))
+
+            raw = serialize(self.data)
+            written = raw != current
+            if written:
+                write_atomic(self.path, raw)
+
+        self._digest = _digest(raw)
+        self._changes = {}
+        self._inserted = []
+        return written
+
+    def _rebase(self, disk):
+        """Adopt another writer's newer `disk` content, keeping this store's own edits.
+
+        Episode dicts are updated in place, so references callers hold stay
+        valid. Raises ConflictError (before changing anything) if both sides
+        changed the same field to different values.
+        """
+        changed_fields = {}
+        for (episode_id, field), change in self._changes.items():
+            changed_fields.setdefault(episode_id, {})[field] = change
+
+        disk_by_id = {ep["id"]: ep for ep in disk["episodes"]}
+        conflicts = []
+        for episode_id, fields in changed_fields.items():
+            theirs_ep = disk_by_id.get(episode_id)
+            if theirs_ep is None:
+                continue
+            for field, (old, new) in fields.items():
+                theirs = theirs_ep.get(field, _MISSING)
+                if theirs != old and theirs != new:
+                    conflicts.append(f"{episode_id}.{field}")
+        if conflicts:
+            raise ConflictError(
+                f"{self.path.name} was changed by another writer: conflicting edits to "
+                + ", ".join(sorted(conflicts))
+            )
+
+        merged = []
+        for theirs_ep in disk["episodes"]:
+            ours = self._by_id.get(theirs_ep["id"])
+            if ours is None:
+                merged.append(theirs_ep)
+                continue
+            mine = changed_fields.get(ours["id"], {})
+            for field in list(ours):
+                if field not in mine and field not in theirs_ep:
+                    del ours[field]
+            for field, value in theirs_ep.items():
+                if field not in mine:
+                    ours[field] = value
+            merged.append(ours)
+
+        on_disk = set(disk_by_id)
+        for index, episode_id in self._inserted:
+            if episode_id not in on_disk and episode_id in self._by_id:
+                merged.insert(min(index, len(merged)), self._by_id[episode_id])
+
+        # Mutate in place too, so callers holding store.episodes see the merge.
+        self.episodes[:] = merged
+        for key, value in disk.items():
+            if key != "episodes":
+                self.data[key] = value
+        self._reindex()
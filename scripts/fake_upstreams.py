@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Local fake upstreams for offline benchmarking and regression runs.
+
+Serves stand-ins for every service the scripts call, each on its own port
+(so each gets its own rate_limit limiter, as the real hosts do):
+
+    feed        Megaphone RSS — the recorded feed fixture, with ETag/304
+    apple       itunes.apple.com /search and /lookup (show catalog)
+    justwatch   JustWatch GraphQL — aliased title searches and node-by-ID
+    wikipedia   Wikipedia Action API — exact-title and generator=search
+    wikidata    Wikidata Action API — wbgetentities claims and labels
+
+Answers are built from episodes.json (titles, years, directors, genres,
+studios, offers, Apple URLs), so a run against the fakes matches films the
+way a live run would. Every service can inject latency, jitter, random 500s
+and periodic 429 bursts with Retry-After. Each fault flag takes a bare value
+for all services or service=value for one, and can be repeated.
+
+The scripts read their base URLs from FEED_URL, RSS_URL, APPLE_SEARCH_URL,
+APPLE_LOOKUP_URL, JUSTWATCH_GRAPHQL, WIKIPEDIA_API and WIKIDATA_API; this
+prints matching export lines on startup, then serves until Ctrl-C.
+
+Runs against the fakes write fake IDs, offers and check dates, so point
+EPISODES_PATH and CACHE_DIR at scratch copies first: otherwise they land in
+the tracked src/data/episodes.json and in .cache/ (feed validators, negative
+cache), where a later live run would trust them. --episodes defaults to
+EPISODES_PATH, so the fakes answer from the same copy.
+
+Usage:
+    cp src/data/episodes.json /tmp/episodes.json
+    export EPISODES_PATH=/tmp/episodes.json CACHE_DIR=/tmp/fake-cache
+    python3 scripts/fake_upstreams.py > /tmp/fakes.env &
+    source /tmp/fakes.env
+    python3 scripts/weekly_pipeline.py --no-cache --ids heat,collateral --metrics run.json
+
+    python3 scripts/fake_upstreams.py --latency 0.15 --jitter 0.05 \\
+        --error-rate 0.02 --burst-every apple=40 --burst-length 5
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from episode_store import EPISODES_PATH, STREAMING_SERVICES
+
+FEED_FIXTURE = Path(__file__).parent / "fixtures" / "feed.xml"
+
+# The iTunes lookup endpoint returns at most this many episodes.
+APPLE_LOOKUP_MAX = 200
+FEED_PATH = "/the-rewatchables"
+SHOW_COLLECTION_ID = 1268527882
+
+SERVICES = ["feed", "apple", "justwatch", "wikipedia", "wikidata"]
+
+# JustWatch package ids per streaming key / rent-buy name (inverse of the
+# maps in fetch_streaming_availability).
+PACKAGE_IDS = {
+    "netflix": 8, "stan": 21, "primeVideo": 119, "disneyPlus": 337, "binge": 385,
+    "paramount": 531, "appleTv": 350, "hboMax": 1899,
+}
+RENT_BUY_IDS = {"Apple TV": 2, "Google Play": 3, "Amazon": 10, "YouTube": 192, "Microsoft Store": 68}
+
+# Wikidata labels that enrich_metadata maps back to our genre and studio names.
+GENRE_LABELS = {
+    "Sci-Fi": "science fiction film",
+    "Animation": "animated film",
+    "History": "historical film",
+    "Music": "musical film",
+}
+STUDIO_LABELS = {
+    "warner-bros": "Warner Bros. Pictures", "new-line": "New Line Cinema",
+    "universal": "Universal Pictures", "paramount": "Paramount Pictures",
+    "disney": "Walt Disney Pictures", "20th-century": "20th Century Studios",
+    "sony": "Columbia Pictures", "tristar": "TriStar Pictures", "mgm": "Metro-Goldwyn-Mayer",
+    "lionsgate": "Lionsgate", "a24": "A24", "miramax": "Miramax", "dreamworks": "DreamWorks Pictures",
+    "orion": "Orion Pictures", "fox-searchlight": "Searchlight Pictures", "marvel": "Marvel Studios",
+    "lucasfilm": "Lucasfilm", "apple": "Apple Studios", "gramercy": "Gramercy Pictures",
+    "embassy": "Embassy Pictures", "working-title": "Working Title Films",
+    "polygram": "PolyGram Filmed Entertainment",
+}
+
+
+def _words(text):
+    """Lowercased words with quotes dropped, space-joined, for title matching."""
+    return " ".join(re.findall(r"[a-z0-9]+", re.sub(r"['‘’]", "", text.lower())))
+
+
+def _qid(label):
+    return f"Q{zlib.crc32(label.encode()) % 10_000_000 + 1_000_000}"
+
+
+class Catalog:
+    """The films the fakes know about, indexed the ways the services look them up."""
+
+    def __init__(self, episodes):
+        self.films = []
+        self.labels = {}
+        for n, ep in enumerate(episodes):
+            if not ep.get("title"):
+                continue
+            film = {
+                "title": re.sub(r"\s*\((Live|Live Show|Part\s+\w+)\)\s*$", "", ep["title"], flags=re.I),
+                "episodeTitle": ep["title"],
+                "year": ep.get("year"),
+                "hosts": ep.get("hosts") or ["Bill Simmons"],
+                "streaming": ep.get("streaming") or {},
+                "justwatchId": ep.get("justwatchId") or f"tm{900000 + n}",
+                "trackId": 1000000000000 + n,
+                "appleUrl": (ep.get("applePodcastsUrl") or "").replace("/au/", "/us/"),
+            }
+            film["qid"] = ep.get("wikidataId") or _qid(f"film:{film['title']}:{film['year']}")
+            film["claims"] = self._claims(ep, film)
+            self.films.append(film)
+
+        self.by_qid = {f["qid"]: f for f in self.films}
+        self.by_node_id = {f["justwatchId"]: f for f in self.films}
+        self.by_norm = {}
+        for film in self.films:
+            self.by_norm.setdefault(_words(film["title"]), []).append(film)
+
+    def _label_qid(self, label):
+        qid = _qid(f"label:{label}")
+        self.labels[qid] = label
+        return qid
+
+    def _claims(self, ep, film):
+        def items(labels):
+            return [{"mainsnak": {"datavalue": {"value": {"id": self._label_qid(label)}}}}
+                    for label in labels]
+        claims = {
+            "P57": items([d.strip() for d in (ep.get("director") or "").split(",") if d.strip()]),
+            "P136": items([GENRE_LABELS.get(g, f"{g.lower()} film") for g in ep.get("genres") or []]),
+        }
+        if ep.get("studio") in STUDIO_LABELS:
+            claims["P750"] = items([STUDIO_LABELS[ep["studio"]]])
+        if film["year"]:
+            claims["P577"] = [{"mainsnak": {"datavalue": {"value": {"time": f"+{film['year']}-01-01T00:00:00Z"}}}}]
+        return claims
+
+    def search(self, text, limit=5):
+        """Films whose title appears in `text`, longest (most specific) title first."""
+        year = re.search(r"\b(19|20)\d{2}\b", text)
+        padded = f" {_words(text)} "
+        hits = [f for key, films in self.by_norm.items() if key and f" {key} " in padded for f in films]
+        hits.sort(key=lambda f: (-len(f["title"]), f["year"] != (int(year.group()) if year else None)))
+        return hits[:limit]
+
+    def page_title(self, title):
+        """The film an exact "Title (YEAR film)" / "Title (film)" page name refers to."""
+        m = re.match(r"^(.*) \((?:(\d{4}) )?film\)$", title)
+        if not m:
+            return None
+        films = self.by_norm.get(_words(m.group(1)), [])
+        if m.group(2):
+            films = [f for f in films if str(f["year"]) == m.group(2)]
+        elif len(films) > 1:
+            return None  # ambiguous: real Wikipedia has a disambiguation page here
+        return films[0] if films else None
+
+
+class Faults:
+    """Per-service latency, jitter, error rate and 429 bursts."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, burst_every=0, burst_length=0, retry_after=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def apply(self):
+        """Sleep for the configured latency; return an (status, headers) fault or None."""
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self._count += 1
+            n = self._count
+        if self.burst_every and (n - 1) % self.burst_every >= self.burst_every - self.burst_length:
+            return 429, {"Retry-After": str(self.retry_after)}
+        if self.error_rate and random.random() < self.error_rate:
+            return 500, {}
+        return None
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+    catalog = None
+    faults = None
+    feed_body = b""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        if body and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, body=None):
+        fault = self.faults.apply()
+        if fault:
+            status, headers = fault
+            self._send(status, {"error": "injected"}, headers=headers)
+            return
+        parts = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        handler = getattr(self, f"serve_{self.service}")
+        handler(parts.path, query, body)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._handle(self.rfile.read(length))
+
+    # --- services -----------------------------------------------------------
+
+    def serve_feed(self, path, query, body):
+        etag = f'"{zlib.crc32(self.feed_body):08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(200, self.feed_body, "application/rss+xml", {"ETag": etag})
+
+    def _track(self, film):
+        hosts = film["hosts"]
+        names = hosts[0] if len(hosts) == 1 else f"{', '.join(hosts[:-1])}, and {hosts[-1]}"
+        url = film["appleUrl"] or (f"https://podcasts.apple.com/us/podcast/the-rewatchables/"
+                                   f"id{SHOW_COLLECTION_ID}?i={film['trackId']}")
+        return {
+            "wrapperType": "podcastEpisode",
+            "kind": "podcast-episode",
+            "collectionId": SHOW_COLLECTION_ID,
+            "collectionName": "The Rewatchables",
+            "trackId": film["trackId"],
+            "trackName": f"'{film['episodeTitle']}' With {names}",
+            "trackViewUrl": url,
+        }
+
+    def serve_apple(self, path, query, body):
+        limit = int(query.get("limit", 50))
+        if path.endswith("/lookup"):
+            # Like the real endpoint: newest episodes only, capped at 200, and
+            # `offset` is ignored.
+            show = {"wrapperType": "track", "kind": "podcast", "collectionId": SHOW_COLLECTION_ID,
+                    "collectionName": "The Rewatchables"}
+            tracks = [self._track(f) for f in self.catalog.films[:min(limit, APPLE_LOOKUP_MAX)]]
+            results = [show] + tracks
+        else:
+            term = re.sub(r"^the rewatchables\s+", "", query.get("term", ""), flags=re.I)
+            results = [self._track(f) for f in self.catalog.search(term, limit)]
+        self._send(200, {"resultCount": len(results), "results": results})
+
+    def _node(self, film):
+        streaming = film["streaming"]
+        offers = [{"monetizationType": "FLATRATE", "package": {"packageId": PACKAGE_IDS[key], "clearName": key}}
+                  for key in STREAMING_SERVICES if streaming.get(key) and key in PACKAGE_IDS]
+        offers += [{"monetizationType": "RENT", "package": {"packageId": RENT_BUY_IDS[name], "clearName": name}}
+                   for name in streaming.get("rentBuy", []) if name in RENT_BUY_IDS]
+        return {
+            "id": film["justwatchId"],
+            "objectId": int(re.sub(r"\D", "", film["justwatchId"]) or 0),
+            "objectType": "MOVIE",
+            "content": {"title": film["title"], "originalReleaseYear": film["year"]},
+            "offers": offers,
+        }
+
+    def serve_justwatch(self, path, query, body):
+        request = json.loads(body or b"{}")
+        variables = request.get("variables", {})
+        first = variables.get("first", 5)
+        data = {}
+        for name, value in variables.items():
+            if name.startswith("id") and name[2:].isdigit():
+                film = self.catalog.by_node_id.get(value)
+                data[f"n{name[2:]}"] = self._node(film) if film else None
+            elif name == "searchTitlesFilter" or (name.startswith("f") and name[1:].isdigit()):
+                alias = "popularTitles" if name == "searchTitlesFilter" else f"t{name[1:]}"
+                films = self.catalog.search(value.get("searchQuery", ""), first)
+                data[alias] = {"edges": [{"node": self._node(f)} for f in films]}
+        self._send(200, {"data": data})
+
+    def serve_wikipedia(self, path, query, body):
+        pages = {}
+        if "gsrsearch" in query:
+            text = re.sub(r"\s+film$", "", query["gsrsearch"])
+            for index, film in enumerate(self.catalog.search(text, int(query.get("gsrlimit", 5))), 1):
+                page = f"{film['title']} ({film['year']} film)" if film["year"] else film["title"]
+                pages[str(film["trackId"])] = {"title": page, "index": index,
+                                               "pageprops": {"wikibase_item": film["qid"]}}
+        else:
+            for n, title in enumerate(query.get("titles", "").split("|")):
+                film = self.catalog.page_title(title)
+                if film:
+                    pages[str(film["trackId"])] = {"title": title, "pageprops": {"wikibase_item": film["qid"]}}
+                else:
+                    pages[str(-1 - n)] = {"title": title, "missing": ""}
+        self._send(200, {"query": {"pages": pages}} if pages else {"batchcomplete": ""})
+
+    def serve_wikidata(self, path, query, body):
+        entities = {}
+        for qid in query.get("ids", "").split("|"):
+            film = self.catalog.by_qid.get(qid)
+            if query.get("props") == "labels" and qid in self.catalog.labels:
+                entities[qid] = {"labels": {"en": {"language": "en", "value": self.catalog.labels[qid]}}}
+            elif film and query.get("props") == "claims":
+                entities[qid] = {"claims": film["claims"]}
+            else:
+                entities[qid] = {"id": qid, "missing": ""}
+        self._send(200, {"entities": entities})
+
+
+ENV_PATHS = {
+    "feed": [("FEED_URL", FEED_PATH), ("RSS_URL", FEED_PATH)],
+    "apple": [("APPLE_SEARCH_URL", "/search"), ("APPLE_LOOKUP_URL", "/lookup")],
+    "justwatch": [("JUSTWATCH_GRAPHQL", "/graphql")],
+    "wikipedia": [("WIKIPEDIA_API", "/w/api.php")],
+    "wikidata": [("WIKIDATA_API", "/w/api.php")],
+}
+
+
+def start(faults=None, episodes_path=EPISODES_PATH, feed_path=FEED_FIXTURE, host="127.0.0.1", base_port=0):
+    """Start every fake on a background thread.
+
+    `faults` maps service name → Faults. Ports are base_port, base_port+1, ...
+    (or ephemeral with base_port=0). Returns (servers, env) where env maps
+    each base-URL variable to its fake.
+    """
+    with open(episodes_path) as f:
+        catalog = Catalog(json.load(f)["episodes"])
+    feed_body = Path(feed_path).read_bytes()
+    faults = faults or {}
+
+    servers, env = [], {}
+    for n, service in enumerate(SERVICES):
+        handler = type(f"Fake{service.title()}Handler", (FakeHandler,), {
+            "service": service,
+            "catalog": catalog,
+            "faults": faults.get(service) or Faults(),
+            "feed_body": feed_body,
+        })
+        server = ThreadingHTTPServer((host, base_port + n if base_port else 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        for var, path in ENV_PATHS[service]:
+            env[var] = f"http://{host}:{server.server_address[1]}{path}"
+    return servers, env
+
+
+def _per_service(values, cast, default):
+    """Parse repeated `value` / `service=value` flags into {service: value}."""
+    out = {service: default for service in SERVICES}
+    for raw in values or []:
+        name, _, value = raw.rpartition("=")
+        if name and name not in SERVICES:
+            raise argparse.ArgumentTypeError(f"unknown service {name!r} (choose from {', '.join(SERVICES)})")
+        for service in ([name] if name else SERVICES):
+            out[service] = cast(value)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local fakes of the feed, Apple, JustWatch and Wikimedia APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901, help="First port; services use consecutive ports")
+    parser.add_argument("--episodes", type=Path, default=EPISODES_PATH, help="Catalog the fakes answer from")
+    parser.add_argument("--feed", type=Path, default=FEED_FIXTURE, help="RSS fixture served as the feed")
+    fault_help = " (VALUE for every service or SERVICE=VALUE; repeatable)"
+    parser.add_argument("--latency", action="append", metavar="[SERVICE=]SECONDS",
+                        help="Added response latency" + fault_help)
+    parser.add_argument("--jitter", action="append", metavar="[SERVICE=]SECONDS",
+                        help="Uniform +/- jitter on the latency" + fault_help)
+    parser.add_argument("--error-rate", action="append", metavar="[SERVICE=]P",
+                        help="Probability of an HTTP 500" + fault_help)
+    parser.add_argument("--burst-every", action="append", metavar="[SERVICE=]N",
+                        help="Every N requests, end with a 429 burst" + fault_help)
+    parser.add_argument("--burst-length", action="append", metavar="[SERVICE=]N",
+                        help="Requests per 429 burst (default 3)" + fault_help)
+    parser.add_argument("--retry-after", action="append", metavar="[SERVICE=]SECONDS",
+                        help="Retry-After sent with 429s (default 1)" + fault_help)
+    args = parser.parse_args()
+
+    try:
+        settings = {
+            "latency": _per_service(args.latency, float, 0.0),
+            "jitter": _per_service(args.jitter, float, 0.0),
+            "error_rate": _per_service(args.error_rate, float, 0.0),
+            "burst_every": _per_service(args.burst_every, int, 0),
+            "burst_length": _per_service(args.burst_length, int, 3),
+            "retry_after": _per_service(args.retry_after, int, 1),
+        }
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+    faults = {service: Faults(**{key: values[service] for key, values in settings.items()})
+              for service in SERVICES}
+
+    servers, env = start(faults, args.episodes, args.feed, args.host, args.port)
+    for var, url in env.items():
+        print(f"export {var}={url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,62 +4,108 @@ Fetch Apple Podcasts URLs for each episode.
 
 Usage:
     python3 scripts/fetch_apple_podcast_urls.py
+    python3 scripts/fetch_apple_podcast_urls.py --catalog --force
+    python3 scripts/fetch_apple_podcast_urls.py --journal
 
 This script searches Apple Podcasts for each episode and updates episodes.json
 with direct episode links.
+
+--catalog pulls the show's newest episodes in one iTunes lookup call,
+indexes the track names (title_index.TitleIndex), and matches every episode
+locally with the same find_best_match scoring, taking only exact title
+hits. The lookup endpoint returns at most 200 episodes and ignores
+`offset`, so older episodes can't come from the catalog; they, and
+anything without an exact catalog hit, fall back to the per-episode search.
+
+Episodes with no confident match are recorded in the negative cache and
+only retried on an exponential backoff; --force and --ids ignore it.
+
+Progress is checkpointed to episodes.json every few episodes; after a crash
+or Ctrl-C, --resume skips the episodes the interrupted run completed.
 """
 
 import json
+import os
 import re
-import time
-import urllib.request
 import urllib.parse
-from pathlib import Path
 
-EPISODES_PATH = Path(__file__).parent.parent / "src" / "data" / "episodes.json"
-APPLE_SEARCH_URL = "https://itunes.apple.com/search"
+import checkpoint
+import http_cache
+import http_client
+import metrics
+import patch_journal
+from episode_store import EpisodeStore
+from negative_cache import NegativeCache
+from rate_limit import HostUnavailable
+from title_index import TitleIndex, fold
+
+APPLE_SEARCH_URL = os.environ.get("APPLE_SEARCH_URL", "https://itunes.apple.com/search")
+APPLE_LOOKUP_URL = os.environ.get("APPLE_LOOKUP_URL", "https://itunes.apple.com/lookup")
+SHOW_COLLECTION_ID = 1268527882
+
+# iTunes lookup returns at most the newest 200 episodes and has no paging
+# (`offset` is ignored).
+CATALOG_LIMIT = 200
+
+# Negative-cache source key for episodes Apple couldn't match.
+NEGATIVE_SOURCE = "apple"
 
-def search_apple_podcasts(title, retries=3):
-    """Search Apple Podcasts for an episode."""
+def search_apple_podcasts(title):
+    """Search Apple Podcasts for an episode.
+
+    Retries and backoff happen in http_client; raises if the search still
+    fails, so an outage isn't mistaken for "no match".
+    """
     query = urllib.parse.quote(f"The Rewatchables {title}")
     url = f"{APPLE_SEARCH_URL}?term={query}&entity=podcastEpisode&limit=5"
 
-    for attempt in range(retries):
-        try:
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)')
-            with urllib.request.urlopen(req, timeout=15) as response:
-                data = json.loads(response.read().decode())
-                return data.get('results', [])
-        except Exception as e:
-            if attempt < retries - 1:
-                wait_time = (attempt + 1) * 2
-                time.sleep(wait_time)
-            else:
-                print(f"  Error: {e}")
-                return []
-    return []
+    def download():
+        return http_client.get(url).body
+    data = json.loads(http_cache.fetch(url, download).decode())
+    return data.get('results', [])
 
 
-def _normalize_for_match(s):
-    """Lowercase and drop all quote characters. Apple wraps film names in
-    single quotes ('Good Will Hunting' Live From Boston) so the closing
-    quote ends up *inside* film_part after the " with <hosts>" split,
-    breaking prefix matching. Stripping all quotes side-steps the issue and
-    also folds typographic apostrophes vs straight on both needle and
-    track name (e.g. 'Devil's Advocate' → 'devils advocate' on both sides)."""
-    s = s.lower()
-    s = re.sub(r"[‘’“”'\"]", "", s)
-    return s
+def fetch_show_catalog(collection_id=SHOW_COLLECTION_ID):
+    """Fetch the show's newest episodes (at most CATALOG_LIMIT) from the iTunes lookup endpoint.
+
+    Returns episode results in the same shape the search endpoint gives
+    (collectionName, trackName, trackViewUrl), so they feed straight into
+    find_best_match.
+    """
+    query = urllib.parse.urlencode({
+        "id": collection_id,
+        "entity": "podcastEpisode",
+        "limit": CATALOG_LIMIT,
+    })
+    url = f"{APPLE_LOOKUP_URL}?{query}"
+
+    def download():
+        return http_client.get(url, timeout=30).body
+    data = json.loads(http_cache.fetch(url, download).decode())
+    tracks = [r for r in data.get('results', []) if r.get('wrapperType') == 'podcastEpisode']
+    if len(tracks) >= CATALOG_LIMIT:
+        print(f"  Catalog capped at the newest {CATALOG_LIMIT} episodes; older ones will be searched")
+    return tracks
+
+
+def _match_needle(title):
+    """Normalized search needle for a stored title, plus its "(Live)" flag."""
+    is_live_entry = bool(re.search(r'\(live(?:\s+show)?\)\s*$', title, re.IGNORECASE))
+    needle = re.sub(r'\s*\(live(?:\s+show)?\)\s*$', '', title, flags=re.IGNORECASE)
+    return fold(needle).strip(), is_live_entry
 
 
-def find_best_match(title, results, year=None):
+def find_best_match(title, results, year=None, exact=False):
     """Find the best matching episode from search results.
 
     Ranks candidates so an exact title match wins over a sibling-film substring.
     Substring containment alone is too loose: searching "Rocky" used to match
     "Rocky II With Bill Simmons…" because the substring is present.
 
+    exact=True only considers tracks naming the film exactly (or, for a
+    "(Live)" entry, its "Live From …" variant); part-N, anniversary and
+    substring hits are left for the search endpoint to settle.
+
     Returns the URL of the best candidate, or None if nothing scores confidently.
     """
     # Stored titles use "(Live)" / "(Live Show)" to flag entries that
@@ -67,12 +113,11 @@ def find_best_match(title, results, year=None):
     # titles live shows freely as "Live From SF" etc.) but keep a flag so we
     # can prefer the live-variant track for these entries — and conversely
     # prefer the non-live track for entries without the marker.
-    is_live_entry = bool(re.search(r'\(live(?:\s+show)?\)\s*$', title, re.IGNORECASE))
-    needle = re.sub(r'\s*\(live(?:\s+show)?\)\s*$', '', title, flags=re.IGNORECASE)
-    needle = _normalize_for_match(needle).strip()
+    needle, is_live_entry = _match_needle(title)
 
     candidates = []
     for result in results:
+        exact_hit = False
         if 'rewatchables' not in result.get('collectionName', '').lower():
             continue
         track_raw = result.get('trackName', '')
@@ -83,8 +128,11 @@ def find_best_match(title, results, year=None):
         # host preamble, not inside a film title. Also handle "Featuring"
         # which Apple uses occasionally.
         film_raw = re.split(r'\s+(?:With|Featuring)\s+(?=[A-Z])', track_raw, maxsplit=1)[0]
-        track_name = _normalize_for_match(track_raw)
-        film_part = _normalize_for_match(film_raw).strip()
+        # fold() drops every quote character: Apple's closing quote ends up
+        # *inside* film_raw after the " with <hosts>" split, which would break
+        # prefix matching.
+        track_name = fold(track_raw)
+        film_part = fold(film_raw).strip()
         # Apple wraps film titles in quotes ('Rocky', ‘Top Gun’) — strip the
         # wrapping pair so exact-match comparison works. Preserves internal
         # apostrophes like in "Mr. Holland's Opus". Also drop a trailing period
@@ -97,8 +145,10 @@ def find_best_match(title, results, year=None):
             # Exact non-live match. Prefer when entry is non-live; demote when
             # entry is the live-show variant.
             score = 30 if is_live_entry else 100
+            exact_hit = not is_live_entry
         elif film_part == needle:
             score = 30 if is_live_entry else 95
+            exact_hit = not is_live_entry
         elif film_clean.startswith(needle + ' ') or film_clean.startswith(needle + '-'):
             # Distinguish multi-part episodes (Pulp Fiction Part 1) and
             # live-show variants (Good Will Hunting Live From Boston) from
@@ -110,6 +160,7 @@ def find_best_match(title, results, year=None):
                 # Live variant of the named film. Prefer when entry is live;
                 # demote when entry is non-live (so original wins).
                 score = 100 if is_live_entry else 30
+                exact_hit = is_live_entry
             elif re.match(r'\d+(st|nd|rd|th)\s+anniversary\b', extension):
                 # Anniversary re-cover of the named film (e.g. "Die Hard 30th
                 # Anniversary"). Treat as the canonical episode for the named
@@ -129,6 +180,8 @@ def find_best_match(title, results, year=None):
                 score = 15   # bare substring, low confidence
         else:
             continue
+        if exact and not exact_hit:
+            continue
 
         # Year handling. Apple often disambiguates same-name films with a year
         # suffix ("Bad Boys 1983"). Boost when stored year corroborates the
@@ -156,82 +209,160 @@ def find_best_match(title, results, year=None):
     return best_url
 
 
+def find_episode_url(title, year=None, catalog=None):
+    """Find the AU Apple Podcasts URL for an episode.
+
+    Tries the catalog index first (if given), then the search endpoint with
+    a year-augmented retry. Returns (url or None, whether search was used).
+    Raises if a search request fails.
+    """
+    if catalog is not None:
+        # Every scoring branch of find_best_match needs the needle somewhere
+        # in the folded track name (mid-word too: "rock" in "rocky"), so the
+        # tracks containing it are exactly the ones worth scoring. Only an
+        # exact title is trusted here: the catalog holds just the newest
+        # episodes, so an older film's own episode is often missing and a
+        # newer "Part II" or anniversary sibling would otherwise win.
+        needle, _ = _match_needle(title)
+        url = find_best_match(title, catalog.substring(needle), year=year, exact=True)
+        if url:
+            return url.replace('/us/', '/au/'), False
+
+    results = search_apple_podcasts(title)
+    url = find_best_match(title, results, year=year) if results else None
+
+    # Year-augmented retry if first pass was rejected as low-confidence
+    if not url and year:
+        results = search_apple_podcasts(f"{title} {year}")
+        url = find_best_match(title, results, year=year) if results else None
+
+    return (url.replace('/us/', '/au/') if url else None), True
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Fetch Apple Podcasts URLs for episodes")
     parser.add_argument("--force", action="store_true",
                         help="Re-fetch even for entries that already have an episode URL")
     parser.add_argument("--ids", help="Comma-separated episode ids to limit the run to")
+    parser.add_argument("--catalog", action="store_true",
+                        help="Match against the show's full episode list instead of searching per episode")
+    http_cache.add_cache_args(parser)
+    checkpoint.add_checkpoint_args(parser)
+    patch_journal.add_journal_args(parser)
+    metrics.add_metrics_args(parser)
     args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("fetch_apple_podcast_urls", args)
 
-    target_ids = set(s.strip() for s in args.ids.split(",")) if args.ids else None
+    target_ids = list(dict.fromkeys(s.strip() for s in args.ids.split(","))) if args.ids else None
 
     print("Loading episodes...")
-    with open(EPISODES_PATH) as f:
-        data = json.load(f)
+    store = EpisodeStore.load()
+    negatives = NegativeCache.load()
+
+    save_store = patch_journal.saver(store, args, "fetch_apple_podcast_urls")
 
-    episodes = data['episodes']
+    def save():
+        save_store()
+        negatives.save()
+    ckpt = checkpoint.from_args("fetch_apple_podcast_urls", args, save)
+
+    episodes = store.episodes
+    if target_ids:
+        # Jump straight to the requested entries instead of scanning the catalog.
+        episodes = [store.get(i) for i in target_ids if store.has_id(i)]
     updated = 0
     unchanged = 0
     skipped = 0
     not_found = 0
+    failed = 0
+    backed_off = 0
+    from_catalog = 0
 
-    print(f"Processing {len(episodes)} episodes...\n")
-
-    for i, episode in enumerate(episodes):
-        title = episode['title']
-        year = episode.get('year')
-        current_url = episode.get('applePodcastsUrl', '')
-
-        if target_ids and episode.get('id') not in target_ids:
-            continue
-
-        # Skip if already has an episode-specific URL (unless --force)
-        if '?i=' in current_url and not args.force:
-            skipped += 1
-            continue
-
-        print(f"[{i+1}/{len(episodes)}] {title} ({year})...")
-
-        results = search_apple_podcasts(title)
-        url = find_best_match(title, results, year=year) if results else None
+    catalog = None
+    if args.catalog:
+        print("Fetching show catalog...")
+        try:
+            with metrics.stage("catalog"):
+                catalog = TitleIndex(fetch_show_catalog(), key=lambda track: track.get('trackName', ''))
+            print(f"  {len(catalog)} catalog episodes indexed\n")
+        except Exception as e:
+            print(f"  ✗ Catalog lookup failed, searching per episode: {e}\n")
 
-        # Year-augmented retry if first pass was rejected as low-confidence
-        if not url and year:
-            results = search_apple_podcasts(f"{title} {year}")
-            url = find_best_match(title, results, year=year) if results else None
+    print(f"Processing {len(episodes)} episodes...\n")
 
-        if url:
-            url = url.replace('/us/', '/au/')
-            if url == current_url:
-                print(f"  = Unchanged")
-                unchanged += 1
+    with metrics.stage("lookup"), ckpt:
+        for i, episode in enumerate(episodes):
+            title = episode['title']
+            year = episode.get('year')
+            current_url = episode.get('applePodcastsUrl', '')
+
+            if episode['id'] in ckpt.done:
+                continue
+
+            # Skip if already has an episode-specific URL (unless --force)
+            if '?i=' in current_url and not args.force:
+                skipped += 1
+                continue
+            # Skip recent no-match results until their re-check date
+            if not (args.force or target_ids) and not negatives.is_due(NEGATIVE_SOURCE, episode['id']):
+                backed_off += 1
+                continue
+
+            print(f"[{i+1}/{len(episodes)}] {title} ({year})...")
+
+            try:
+                url, searched = find_episode_url(title, year, catalog)
+            except HostUnavailable as e:
+                print(f"  ✗ {e}; stopping")
+                failed += 1
+                break
+            except Exception as e:
+                # Not marked done and no negative entry: retried next run.
+                print(f"  ✗ Lookup failed: {e}")
+                failed += 1
+                continue
+            if url and not searched:
+                from_catalog += 1
+
+            if url:
+                negatives.record_hit(NEGATIVE_SOURCE, episode['id'])
+                if url == current_url:
+                    print(f"  = Unchanged")
+                    unchanged += 1
+                else:
+                    store.set_field(episode, 'applePodcastsUrl', url)
+                    old_short = (current_url.split('?i=')[-1] or '<none>')[:18]
+                    new_short = url.split('?i=')[-1][:18]
+                    print(f"  ✓ {('updated' if current_url else 'set')}: i={old_short} → i={new_short}")
+                    updated += 1
             else:
-                episode['applePodcastsUrl'] = url
-                old_short = (current_url.split('?i=')[-1] or '<none>')[:18]
-                new_short = url.split('?i=')[-1][:18]
-                print(f"  ✓ {('updated' if current_url else 'set')}: i={old_short} → i={new_short}")
-                updated += 1
-        else:
-            print(f"  ✗ No confident match (existing URL left untouched)")
-            not_found += 1
+                print(f"  ✗ No confident match (existing URL left untouched)")
+                negatives.record_miss(NEGATIVE_SOURCE, episode['id'])
+                not_found += 1
+
+            ckpt.mark(episode['id'])
 
-        # Rate limit - be nice to the API
-        time.sleep(1.5)
+    negatives.save()
 
     print(f"\n--- Summary ---")
     print(f"Updated: {updated}")
     print(f"Unchanged (already correct): {unchanged}")
     print(f"Skipped (already have URL): {skipped}")
     print(f"Not found: {not_found}")
+    print(f"Lookup failed (will retry): {failed}")
+    print(f"Backed off (no match recently): {backed_off}")
+    if catalog is not None:
+        print(f"Matched from catalog: {from_catalog} (searched: {updated + unchanged - from_catalog + not_found})")
 
     if updated > 0:
-        print(f"\nSaving to {EPISODES_PATH}...")
-        with open(EPISODES_PATH, 'w') as f:
-            json.dump(data, f, indent=2)
+        print(f"\nSaving to {store.path}...")
+        save_store()
         print("Done!")
     else:
         print("\nNo updates to save.")
+    ckpt.finish()
 
 
 if __name__ == "__main__":
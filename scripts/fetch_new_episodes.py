@@ -10,15 +10,19 @@ Output:
     Prints any new episodes found as JSON objects ready to add to episodes.json
 """
 
+import argparse
 import json
+import os
 import re
-import xml.etree.ElementTree as ET
-from datetime import datetime
-from pathlib import Path
-from urllib.request import urlopen
+from datetime import date, datetime
 
-RSS_URL = "https://feeds.megaphone.fm/the-rewatchables"
-EPISODES_PATH = Path(__file__).parent.parent / "src" / "data" / "episodes.json"
+import feed_parser
+import http_cache
+import metrics
+import podcast_feed
+from episode_store import EpisodeStore
+
+RSS_URL = os.environ.get("RSS_URL", podcast_feed.FEED_URL)
 
 # Known hosts for attribution
 KNOWN_HOSTS = [
@@ -45,54 +49,23 @@ SKIP_PATTERNS = [
     r"\d+th anniversary",  # Anniversary rewatches
     r"live$",  # Live episodes
 ]
+_SKIP_RE = feed_parser.alternation(SKIP_PATTERNS)
 
 
-def fetch_rss():
-    """Fetch and parse RSS feed."""
-    with urlopen(RSS_URL, timeout=30) as response:
-        return ET.parse(response)
-
-
-def normalize_title(title):
-    """Normalize title for comparison (lowercase, standardize quotes)."""
-    title = title.lower()
-    # Replace curly quotes with straight
-    title = title.replace("\u2019", "'").replace("\u2018", "'")
-    title = title.replace("\u201c", '"').replace("\u201d", '"')
-    return title
-
+def fetch_rss(fingerprint=None):
+    """Open the RSS feed for streaming.
 
-def load_existing_episodes():
-    """Load existing episodes from JSON."""
-    with open(EPISODES_PATH) as f:
-        data = json.load(f)
-    # Store list of episodes per title (to handle re-dos)
-    episodes_by_title = {}
-    for ep in data["episodes"]:
-        title = normalize_title(ep["title"])
-        if title not in episodes_by_title:
-            episodes_by_title[title] = []
-        episodes_by_title[title].append(ep)
-    return episodes_by_title
+    resp.not_modified is set when the feed is unchanged since the last run
+    against a database with the same `fingerprint`; otherwise resp.items()
+    yields <item> elements incrementally.
+    """
+    return podcast_feed.fetch(RSS_URL, consumer="fetch_new_episodes", stream=True, fingerprint=fingerprint)
 
 
 def parse_title(raw_title):
     """Extract movie title from episode title."""
-    # Remove "The Rewatchables: " prefix
-    title = re.sub(r"^The Rewatchables:\s*", "", raw_title, flags=re.IGNORECASE)
-    # Remove "With Bill Simmons..." and everything after
-    title = re.sub(r"\s+[Ww]ith\s+.*$", "", title)
-    # Remove "'The Re-...' suffix patterns
-    title = re.sub(r"\s*['\"]\s*The Re-.*$", "", title)
-    # Remove (Part One), (Part Two) etc
-    title = re.sub(r"\s*\(Part\s+\w+\)", "", title, flags=re.IGNORECASE)
-    # Remove year in parentheses like (1987)
-    title = re.sub(r"\s*\(\d{4}\)", "", title)
-    # Strip all types of quotes (straight and curly)
-    title = title.strip()
-    title = re.sub(r"^[\u2018\u2019\u201C\u201D'\"\u2032\u2033]+", "", title)
-    title = re.sub(r"[\u2018\u2019\u201C\u201D'\"\u2032\u2033]+$", "", title)
-    return title.strip()
+    film_part, _ = feed_parser.split_title(raw_title)
+    return feed_parser.clean_title(film_part)
 
 
 def extract_hosts(description):
@@ -106,8 +79,7 @@ def extract_hosts(description):
 
 def should_skip(title):
     """Check if episode should be skipped (non-movie content)."""
-    title_lower = title.lower()
-    return any(re.search(pattern, title_lower) for pattern in SKIP_PATTERNS)
+    return bool(_SKIP_RE.search(title))
 
 
 def create_episode_id(title):
@@ -119,39 +91,44 @@ def create_episode_id(title):
 
 
 def main():
-    print("Fetching RSS feed...")
-    tree = fetch_rss()
-    root = tree.getroot()
-    channel = root.find("channel")
+    parser = argparse.ArgumentParser(description="List feed episodes missing from the database")
+    http_cache.add_cache_args(parser)
+    metrics.add_metrics_args(parser)
+    args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("fetch_new_episodes", args)
 
     print("Loading existing episodes...")
-    existing = load_existing_episodes()
+    store = EpisodeStore.load()
+
+    print("Fetching RSS feed...")
+    resp = fetch_rss(store.fingerprint())
+    if resp.not_modified:
+        print("\nFeed unchanged since the last run against this database. No new episodes!")
+        return
 
     new_episodes = []
 
-    for item in channel.findall("item"):
-        raw_title = item.find("title").text or ""
-        title = parse_title(raw_title)
-        pub_date = item.find("pubDate").text
+    for item in resp.items():
+        parsed = feed_parser.parse_item(item)
+        title = feed_parser.clean_title(parsed.film_part)
 
         if should_skip(title):
             continue
 
-        # Parse date
-        try:
-            dt = datetime.strptime(pub_date, "%a, %d %b %Y %H:%M:%S %z")
-            episode_date = dt.strftime("%Y-%m-%d")
-            this_date = dt.date()
-        except:
+        if parsed.date:
+            episode_date = parsed.date
+            this_date = date.fromisoformat(parsed.date)
+        else:
             episode_date = datetime.now().strftime("%Y-%m-%d")
             this_date = None
 
         # Check if already exists (but allow re-dos if date is > 7 days apart)
-        normalized = normalize_title(title)
-        if normalized in existing:
+        existing = store.find_by_title(title)
+        if existing:
             # Check if any existing episode has a date within 7 days
             is_duplicate = False
-            for existing_ep in existing[normalized]:
+            for existing_ep in existing:
                 try:
                     existing_date = datetime.strptime(existing_ep["episodeDate"], "%Y-%m-%d").date()
                     if this_date and abs((this_date - existing_date).days) < 7:
@@ -162,10 +139,13 @@ def main():
 
             if is_duplicate:
                 continue
+        else:
+            similar = store.similar_titles(title, limit=1)
+            if similar:
+                print(f"  ⚠️  {title}: similar title already in database: {similar[0][1]['title']}")
 
         # Get description for host extraction
-        description = item.find("description").text or ""
-        hosts = extract_hosts(description)
+        hosts = extract_hosts(parsed.description)
 
         # Build episode object
         episode = {
@@ -200,6 +180,7 @@ def main():
 
     if not new_episodes:
         print("\nNo new episodes found!")
+        podcast_feed.remember(resp, store.fingerprint())
         return
 
     print(f"\nFound {len(new_episodes)} new episode(s):\n")
@@ -4,18 +4,47 @@ Fetch streaming availability from JustWatch for Australian services.
 
 Usage:
     python3 scripts/fetch_streaming_availability.py
+    python3 scripts/fetch_streaming_availability.py --force --workers 8 --rate 6
+    python3 scripts/fetch_streaming_availability.py --force --batch-size 20
+    python3 scripts/fetch_streaming_availability.py --force --rematch
+    python3 scripts/fetch_streaming_availability.py --journal
 
 This script searches JustWatch for each movie and updates episodes.json
-with Australian streaming availability.
+with Australian streaming availability. Lookups run on a thread pool behind
+the shared, self-tuning JustWatch rate limit (--rate sets where it starts);
+results are applied in catalog order, so the output matches a serial run
+(--workers 1). A lookup that errors is reported and retried next run, not
+recorded as "not found". Titles are packed several to a
+request as aliased popularTitles sub-queries (--batch-size).
+
+The matched JustWatch node ID is stored on each episode as "justwatchId".
+Episodes that already have one are refreshed by fetching that node's offers
+directly (also batched), skipping search and find_best_match entirely, so a
+refresh can't drift to a different film. --rematch ignores stored IDs.
+
+Films with no AU offers (or no JustWatch match) are recorded in the negative
+cache and only re-checked on an exponential backoff; --force ignores it.
+
+Progress is checkpointed to episodes.json as results come in; after a crash
+or Ctrl-C, --resume skips the episodes the interrupted run completed.
 """
 
 import json
+import os
 import time
-import urllib.request
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-EPISODES_PATH = Path(__file__).parent.parent / "src" / "data" / "episodes.json"
-JUSTWATCH_GRAPHQL = "https://apis.justwatch.com/graphql"
+import checkpoint
+import http_cache
+import http_client
+import metrics
+import patch_journal
+from episode_store import EpisodeStore, has_streaming
+from negative_cache import NegativeCache
+from rate_limit import HostUnavailable, for_host
+from title_index import normalize
+
+JUSTWATCH_GRAPHQL = os.environ.get("JUSTWATCH_GRAPHQL", "https://apis.justwatch.com/graphql")
 
 # Map JustWatch package IDs to our keys
 PROVIDER_MAP = {
@@ -40,11 +69,8 @@ RENT_BUY_PROVIDERS = {
     68: "Microsoft Store",
 }
 
-GRAPHQL_QUERY = """
-query GetSearchTitles($country: Country!, $searchTitlesFilter: TitleFilter!, $first: Int!) {
-  popularTitles(country: $country, filter: $searchTitlesFilter, first: $first) {
-    edges {
-      node {
+# Fields read from a title node, shared by search and refresh-by-ID queries.
+NODE_FIELDS = """
         id
         objectId
         objectType
@@ -59,53 +85,193 @@ query GetSearchTitles($country: Country!, $searchTitlesFilter: TitleFilter!, $fi
             clearName
           }
         }
-      }
+"""
+
+# Selection set shared by the single-title and batched queries.
+TITLE_FIELDS = """
+    edges {
+      node {%s      }
     }
-  }
+""" % NODE_FIELDS
+
+GRAPHQL_QUERY = """
+query GetSearchTitles($country: Country!, $searchTitlesFilter: TitleFilter!, $first: Int!) {
+  popularTitles(country: $country, filter: $searchTitlesFilter, first: $first) {%s  }
 }
-"""
+""" % TITLE_FIELDS
+
+# Negative-cache source key for "no AU offers / no match" results.
+NEGATIVE_SOURCE = "justwatch"
+
+# Titles packed into one aliased popularTitles request in batch mode.
+DEFAULT_BATCH_SIZE = 10
+
+# Returned by lookup_episodes for an episode whose lookup hit a network/API
+# error, as distinct from None (searched fine, no match).
+LOOKUP_FAILED = "lookup-failed"
+
+
+def _search_query(title, year):
+    return f"{title} {year}" if year else title
+
+
+def _post_graphql(query, variables):
+    """POST a GraphQL query to JustWatch and return the decoded response body."""
+    payload = json.dumps({
+        "query": query,
+        "variables": variables
+    }).encode("utf-8")
+
+    def download():
+        return http_client.post(JUSTWATCH_GRAPHQL, payload,
+                                headers={"Content-Type": "application/json"}).body
+    return json.loads(http_cache.fetch(JUSTWATCH_GRAPHQL, download, method="POST", body=payload).decode())
 
 
 def search_justwatch(title, year=None):
-    """Search JustWatch for a movie and get streaming offers."""
-    search_query = f"{title} {year}" if year else title
+    """Search JustWatch for a movie and get streaming offers.
 
+    Raises on request failure; an empty list means JustWatch found nothing.
+    """
     variables = {
         "country": "AU",
         "searchTitlesFilter": {
-            "searchQuery": search_query
+            "searchQuery": _search_query(title, year)
         },
         "first": 5
     }
 
-    payload = json.dumps({
-        "query": GRAPHQL_QUERY,
-        "variables": variables
-    }).encode("utf-8")
+    data = _post_graphql(GRAPHQL_QUERY, variables)
+    return (data.get("data") or {}).get("popularTitles", {}).get("edges", [])
+
+
+def _search_or_failed(title, year):
+    try:
+        return search_justwatch(title, year)
+    except HostUnavailable:
+        raise
+    except Exception as e:
+        print(f"  ✗ Lookup error for {title}: {e}")
+        return LOOKUP_FAILED
+
+
+def build_batch_query(count):
+    """Build one query with `count` aliased popularTitles searches (t0, t1, ...)."""
+    params = "".join(f", $f{n}: TitleFilter!" for n in range(count))
+    fields = "".join(
+        f"  t{n}: popularTitles(country: $country, filter: $f{n}, first: $first) {{{TITLE_FIELDS}  }}\n"
+        for n in range(count)
+    )
+    return f"query GetSearchTitlesBatch($country: Country!, $first: Int!{params}) {{\n{fields}}}\n"
+
+
+def search_justwatch_batch(items):
+    """Search JustWatch for several (title, year) pairs in a single request.
+
+    Returns one edges list per item, in order — the same shape search_justwatch
+    returns, so each part feeds straight into find_best_match / parse_offers.
+    If the batch request fails outright, or an alias comes back empty because
+    of a GraphQL error, those titles are retried one at a time; a title whose
+    retry fails too gets LOOKUP_FAILED instead of a list.
+    """
+    if len(items) == 1:
+        return [_search_or_failed(*items[0])]
+
+    variables = {"country": "AU", "first": 5}
+    for n, (title, year) in enumerate(items):
+        variables[f"f{n}"] = {"searchQuery": _search_query(title, year)}
 
     try:
-        req = urllib.request.Request(
-            JUSTWATCH_GRAPHQL,
-            data=payload,
-            headers={
-                "Content-Type": "application/json",
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
-            }
-        )
-        with urllib.request.urlopen(req, timeout=15) as response:
-            data = json.loads(response.read().decode())
-            return data.get("data", {}).get("popularTitles", {}).get("edges", [])
+        data = _post_graphql(build_batch_query(len(items)), variables)
+    except HostUnavailable:
+        raise
     except Exception as e:
-        print(f"  Error: {e}")
-        return []
+        print(f"  Batch error ({len(items)} titles), retrying singly: {e}")
+        return [_search_or_failed(title, year) for title, year in items]
+
+    parts = data.get("data") or {}
+    results = []
+    for n, (title, year) in enumerate(items):
+        part = parts.get(f"t{n}")
+        if part is None:
+            results.append(_search_or_failed(title, year))
+        else:
+            results.append(part.get("edges", []))
+    return results
+
+
+def build_node_query(count):
+    """Build one query fetching `count` title nodes by ID (aliases n0, n1, ...)."""
+    params = "".join(f", $id{n}: ID!" for n in range(count))
+    fields = "".join(
+        f"  n{n}: node(id: $id{n}) {{\n      ... on MovieOrShow {{{NODE_FIELDS}      }}\n  }}\n"
+        for n in range(count)
+    )
+    return f"query GetTitleNodes($country: Country!{params}) {{\n{fields}}}\n"
+
+
+def fetch_nodes(node_ids):
+    """Fetch title nodes for previously matched JustWatch IDs in a single request.
+
+    Returns one node (or None if JustWatch no longer knows the ID) per ID, in
+    order. Raises on request failure so the caller can fall back to search.
+    """
+    variables = {"country": "AU"}
+    for n, node_id in enumerate(node_ids):
+        variables[f"id{n}"] = node_id
+    data = _post_graphql(build_node_query(len(node_ids)), variables)
+    parts = data.get("data") or {}
+    return [parts.get(f"n{n}") or None for n in range(len(node_ids))]
+
+
+def lookup_episodes(episodes, rematch=False):
+    """Return the JustWatch node for each episode, in order.
+
+    Episodes with a stored justwatchId are refreshed by ID; the rest (and any
+    whose ID no longer resolves) go through search + find_best_match. An
+    episode whose lookup errored gets LOOKUP_FAILED rather than None, so an
+    outage isn't recorded as "not on JustWatch".
+    """
+    nodes = [None] * len(episodes)
+
+    known = [n for n, ep in enumerate(episodes) if ep.get("justwatchId") and not rematch]
+    if known:
+        try:
+            refreshed = fetch_nodes([episodes[n]["justwatchId"] for n in known])
+        except HostUnavailable as e:
+            print(f"  ✗ {e}")
+            return [LOOKUP_FAILED] * len(episodes)
+        except Exception as e:
+            print(f"  Refresh error ({len(known)} titles), searching instead: {e}")
+            refreshed = [None] * len(known)
+        for n, node in zip(known, refreshed):
+            nodes[n] = node
+    to_search = [n for n in range(len(episodes)) if nodes[n] is None]
+
+    if to_search:
+        items = [(episodes[n]["title"], episodes[n].get("year")) for n in to_search]
+        try:
+            found = search_justwatch_batch(items)
+        except HostUnavailable as e:
+            print(f"  ✗ {e}")
+            found = [LOOKUP_FAILED] * len(items)
+        for n, (title, year), results in zip(to_search, items, found):
+            nodes[n] = LOOKUP_FAILED if results == LOOKUP_FAILED else find_best_match(title, year, results)
+    return nodes
 
 
 def find_best_match(title, year, results):
-    """Find the best matching movie from search results."""
+    """Find the best matching movie from search results.
+
+    Titles are compared as title_index.normalize keys, so quote style and
+    punctuation ("Spider-Man" vs "Spider Man") don't block a match. An exact
+    key wins over an earlier result that only contains the title.
+    """
     if not results:
         return None
 
-    title_lower = title.lower()
+    wanted = normalize(title)
+    close = None
 
     for edge in results:
         node = edge.get("node", {})
@@ -113,16 +279,23 @@ def find_best_match(title, year, results):
             continue
 
         content = node.get("content", {})
-        item_title = content.get("title", "").lower()
+        item_title = normalize(content.get("title", ""))
         item_year = content.get("originalReleaseYear")
 
         # Exact or close title match with year
-        if title_lower in item_title or item_title in title_lower:
+        if wanted in item_title or item_title in wanted:
             if year and item_year:
-                if abs(item_year - year) <= 1:
-                    return node
-            elif not year:
+                if abs(item_year - year) > 1:
+                    continue
+            elif year:
+                continue
+            if item_title == wanted:
                 return node
+            if close is None:
+                close = node
+
+    if close is not None:
+        return close
 
     # Fallback to first movie result
     for edge in results:
@@ -174,81 +347,141 @@ def parse_offers(node):
     return streaming
 
 
+def apply_result(store, episode, node, i, total):
+    """Write a lookup result onto the episode and print the progress line."""
+    title = episode["title"]
+    year = episode.get("year")
+    print(f"[{i+1}/{total}] {title} ({year or 'no year'})...")
+
+    if not node:
+        print(f"  ✗ Not found")
+        return
+
+    content = node.get("content", {})
+    found_title = content.get("title")
+    found_year = content.get("originalReleaseYear")
+
+    streaming = parse_offers(node)
+    if node.get("id"):
+        store.set_field(episode, "justwatchId", node["id"])
+    store.set_field(episode, "streaming", streaming)
+    store.set_field(episode, "lastStreamingCheck", time.strftime("%Y-%m-%d"))
+
+    # Show what we found
+    services = [k for k, v in streaming.items() if v is True]
+    if services:
+        print(f"  ✓ {found_title} ({found_year}) - {', '.join(services)}")
+    elif streaming["rentBuy"]:
+        print(f"  ✓ {found_title} ({found_year}) - Rent/Buy: {', '.join(streaming['rentBuy'])}")
+    else:
+        print(f"  ✓ {found_title} ({found_year}) - Not streaming")
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description="Fetch streaming availability from JustWatch AU")
     parser.add_argument("--force", action="store_true", help="Re-check all entries, even those with existing data")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent JustWatch lookups (1 = serial)")
+    parser.add_argument("--rate", type=float,
+                        help="Starting JustWatch requests per second across all workers "
+                             "(adapts to upstream feedback)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Titles per GraphQL request (1 = one request per title)")
+    parser.add_argument("--rematch", action="store_true",
+                        help="Ignore stored JustWatch IDs and search/match every title again")
+    http_cache.add_cache_args(parser)
+    checkpoint.add_checkpoint_args(parser)
+    patch_journal.add_journal_args(parser)
+    metrics.add_metrics_args(parser)
     args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("fetch_streaming_availability", args)
 
     print("Loading episodes...")
-    with open(EPISODES_PATH) as f:
-        data = json.load(f)
+    store = EpisodeStore.load()
 
-    episodes = data["episodes"]
-    updated = 0
-    not_found = 0
-    already_has = 0
+    negatives = NegativeCache.load()
 
-    print(f"Processing {len(episodes)} episodes...\n")
+    save_store = patch_journal.saver(store, args, "fetch_streaming_availability")
 
-    for i, episode in enumerate(episodes):
-        title = episode["title"]
-        year = episode.get("year")
-        current_streaming = episode.get("streaming", {})
+    def save():
+        save_store()
+        negatives.save()
+    ckpt = checkpoint.from_args("fetch_streaming_availability", args, save)
 
-        # Skip if already has streaming data (unless --force)
-        has_streaming = any(
-            current_streaming.get(k) for k in
-            ["netflix", "stan", "primeVideo", "disneyPlus", "binge", "paramount", "appleTv", "hboMax"]
-        ) or current_streaming.get("rentBuy")
+    episodes = store.episodes
+    updated = 0
+    not_found = 0
+    failed = 0
 
-        if has_streaming and not args.force:
-            already_has += 1
+    # Skip entries that already have streaming data, and ones that recently
+    # came back with nothing (unless --force)
+    pending = []
+    already_has = backed_off = 0
+    for i, episode in enumerate(episodes):
+        if episode["id"] in ckpt.done:
             continue
-
-        print(f"[{i+1}/{len(episodes)}] {title} ({year or 'no year'})...")
-
-        results = search_justwatch(title, year)
-        node = find_best_match(title, year, results)
-
-        if node:
-            content = node.get("content", {})
-            found_title = content.get("title")
-            found_year = content.get("originalReleaseYear")
-
-            streaming = parse_offers(node)
-            episode["streaming"] = streaming
-            episode["lastStreamingCheck"] = time.strftime("%Y-%m-%d")
-
-            # Show what we found
-            services = [k for k, v in streaming.items() if v is True]
-            if services:
-                print(f"  ✓ {found_title} ({found_year}) - {', '.join(services)}")
-            elif streaming["rentBuy"]:
-                print(f"  ✓ {found_title} ({found_year}) - Rent/Buy: {', '.join(streaming['rentBuy'])}")
-            else:
-                print(f"  ✓ {found_title} ({found_year}) - Not streaming")
-
-            updated += 1
+        if args.force:
+            pending.append((i, episode))
+        elif has_streaming(episode.get("streaming")):
+            already_has += 1
+        elif not negatives.is_due(NEGATIVE_SOURCE, episode["id"]):
+            backed_off += 1
         else:
-            print(f"  ✗ Not found")
-            not_found += 1
+            pending.append((i, episode))
+
+    print(f"Processing {len(episodes)} episodes...\n")
 
-        # Rate limit
-        time.sleep(0.3)
+    for_host(JUSTWATCH_GRAPHQL, rate=args.rate, burst=args.workers)
+
+    batch_size = max(args.batch_size, 1)
+    batches = [pending[n:n + batch_size] for n in range(0, len(pending), batch_size)]
+
+    def lookup(batch):
+        return lookup_episodes([episode for _, episode in batch], args.rematch)
+
+    with metrics.stage("lookup"), ckpt, ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        # map() yields in submission order, so results are applied in catalog
+        # order regardless of which request finishes first.
+        nodes = (node for batch_nodes in pool.map(lookup, batches) for node in batch_nodes)
+        try:
+            for (i, episode), node in zip(pending, nodes):
+                if node == LOOKUP_FAILED:
+                    # Not marked done and no negative entry: retried next run.
+                    print(f"[{i+1}/{len(episodes)}] {episode['title']}...\n  ✗ Lookup failed")
+                    failed += 1
+                    continue
+                apply_result(store, episode, node, i, len(episodes))
+                if node:
+                    updated += 1
+                else:
+                    not_found += 1
+                if node and has_streaming(episode.get("streaming")):
+                    negatives.record_hit(NEGATIVE_SOURCE, episode["id"])
+                else:
+                    negatives.record_miss(NEGATIVE_SOURCE, episode["id"])
+                ckpt.mark(episode["id"])
+        except BaseException:
+            # Don't sit through every queued lookup before checkpointing.
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    negatives.save()
 
     print(f"\n--- Summary ---")
     print(f"Updated: {updated}")
     print(f"Already had data: {already_has}")
+    print(f"Backed off (nothing found recently): {backed_off}")
     print(f"Not found: {not_found}")
+    print(f"Lookup failed (will retry): {failed}")
 
     if updated > 0:
-        print(f"\nSaving to {EPISODES_PATH}...")
-        with open(EPISODES_PATH, "w") as f:
-            json.dump(data, f, indent=2)
+        print(f"\nSaving to {store.path}...")
+        save_store()
         print("Done!")
     else:
         print("\nNo updates to save.")
+    ckpt.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+"""
+Persistent on-disk cache for upstream HTTP responses.
+
+Responses are stored in a local SQLite database under .cache/, keyed by
+method + URL + request body, so reruns of a partially failed workflow (or
+local debugging) replay earlier answers instead of hitting Apple, JustWatch
+and Wikipedia/Wikidata again. Each endpoint gets its own TTL —
+Wikidata labels barely change, JustWatch offers rotate weekly — and the
+store is trimmed least-recently-used first once it grows past MAX_BYTES.
+
+CACHE_DIR (default .cache/) moves this and every other piece of run state
+kept beside it — feed validators, negative cache, checkpoints, journals —
+e.g. to a scratch directory for runs against fake_upstreams.
+
+Usage:
+    import http_cache
+
+    http_cache.add_cache_args(parser)       # --no-cache / --refresh
+    http_cache.configure(args)
+    body = http_cache.fetch(url, lambda: http_client.get(url).body)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get("CACHE_DIR") or Path(__file__).parent.parent / ".cache")
+CACHE_PATH = CACHE_DIR / "http_cache.sqlite"
+
+# Evict least-recently-used entries once the stored bodies exceed this size.
+MAX_BYTES = 200 * 1024 * 1024
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# First matching (host substring, TTL seconds) wins.
+TTL_RULES = [
+    ("wikidata.org", 30 * DAY),          # claims and labels for released films
+    ("wikipedia.org", 7 * DAY),          # search results / page → QID lookups
+    ("itunes.apple.com", DAY),           # episode track URLs never move once published
+    ("apis.justwatch.com", 12 * HOUR),   # offers rotate, keep this short
+]
+# The Megaphone feed is not cached here: podcast_feed revalidates it with a
+# conditional GET on every poll instead.
+DEFAULT_TTL = HOUR
+
+# Modes: "on" reads and writes, "refresh" skips reads but stores fresh
+# responses, "off" bypasses the cache entirely.
+_mode = "on"
+_conn = None
+_lock = threading.Lock()
+
+stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def add_cache_args(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--no-cache", action="store_true",
+                       help="Bypass the on-disk HTTP response cache")
+    group.add_argument("--refresh", action="store_true",
+                       help="Ignore cached responses but store fresh ones")
+
+
+def configure(args=None, mode=None):
+    """Set the cache mode from parsed --no-cache / --refresh flags (or explicitly)."""
+    global _mode
+    if mode is None:
+        if getattr(args, "no_cache", False):
+            mode = "off"
+        elif getattr(args, "refresh", False):
+            mode = "refresh"
+        else:
+            mode = "on"
+    _mode = mode
+
+
+def mode():
+    return _mode
+
+
+def ttl_for(url):
+    for host, ttl in TTL_RULES:
+        if host in url:
+            return ttl
+    return DEFAULT_TTL
+
+
+def cache_key(method, url, body=None):
+    h = hashlib.sha256()
+    h.update(method.upper().encode())
+    h.update(b"\0")
+    h.update(url.encode())
+    h.update(b"\0")
+    if body:
+        h.update(body if isinstance(body, bytes) else body.encode())
+    return h.hexdigest()
+
+
+def _connect():
+    global _conn
+    if _conn is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, url TEXT NOT NULL, body BLOB NOT NULL,"
+            " size INTEGER NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+    return _conn
+
+
+def get(key):
+    """Return the cached body for `key`, or None if missing or expired."""
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT body, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        body, expires = row
+        if expires < now:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return bytes(body)
+
+
+def put(key, url, body, ttl):
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, url, body, size, expires, accessed)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, url, body, len(body), now + ttl, now),
+        )
+        stats["stores"] += 1
+        _evict(conn)
+
+
+def _evict(conn):
+    """Drop expired entries, then LRU entries until the store fits in MAX_BYTES."""
+    conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    # Trim to 90% so we don't evict on every subsequent put.
+    target = MAX_BYTES * 0.9
+    for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+        if total <= target:
+            break
+        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        total -= size
+        stats["evictions"] += 1
+
+
+def fetch(url, do_fetch, method="GET", body=None, ttl=None):
+    """Return response bytes for a request, via the cache when allowed.
+
+    `do_fetch` performs the real request and returns the body bytes; it is
+    only called on a miss. Exceptions propagate and nothing is cached, so
+    failures are retried on the next run.
+    """
+    if _mode == "off":
+        return do_fetch()
+
+    key = cache_key(method, url, body)
+    if _mode == "on":
+        cached = get(key)
+        if cached is not None:
+            stats["hits"] += 1
+            return cached
+
+    stats["misses"] += 1
+    data = do_fetch()
+    put(key, url, data, ttl if ttl is not None else ttl_for(url))
+    return data
@@ -0,0 +1,384 @@
+"""
+Shared HTTP client with keep-alive connection pools.
+
+urllib.request.urlopen opens a fresh TCP + TLS connection for every call,
+and a single run makes hundreds of calls to itunes.apple.com,
+apis.justwatch.com and wikidata.org — the handshakes were a large share of
+each call's latency. This client keeps idle http.client connections per
+host and reuses them, asks for gzip, applies one timeout and User-Agent
+policy for every script, and records the latency of every request.
+
+A connection is only reused once its response has been read to the end; a
+reused connection the server has since dropped is retried once on a fresh
+one. Redirects are followed. Responses with status >= 400 raise HTTPError.
+Every request goes through its host's adaptive limiter (see rate_limit),
+which also decides retries and trips a circuit breaker for hosts that are
+down.
+
+Usage:
+    import http_client
+
+    resp = http_client.get(url, params={"q": "heat"})
+    data = resp.json()
+    resp = http_client.request("POST", url, body=payload, headers={...})
+"""
+
+import email.utils
+import gzip
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from datetime import datetime, timezone
+
+import rate_limit
+
+DEFAULT_TIMEOUT = 20
+MAX_REDIRECTS = 5
+# Idle connections kept per host; extra ones are closed when returned.
+MAX_IDLE_PER_HOST = 8
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+MAX_RETRY_AFTER = 300.0
+
+# Wikimedia requires a descriptive User-Agent with contact info; Apple and
+# JustWatch get a browser one.
+PROJECT_USER_AGENT = "RewatchablesAU/1.0 (https://rewatchables.au; simon@reflive.com)"
+BROWSER_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
+USER_AGENTS = [
+    ("wikipedia.org", PROJECT_USER_AGENT),
+    ("wikidata.org", PROJECT_USER_AGENT),
+]
+DEFAULT_USER_AGENT = BROWSER_USER_AGENT
+
+# Connection failures that mean a pooled keep-alive connection went stale.
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 ConnectionResetError, BrokenPipeError)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, url, headers, body=b""):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class Response:
+    def __init__(self, status, url, headers, body=None, stream=None, elapsed=0.0):
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.stream = stream
+        self.elapsed = elapsed
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+# One record per request: (host, method, status, seconds, response bytes, reused connection).
+records = []
+# Retried attempts per host.
+retries = {}
+_records_lock = threading.Lock()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def user_agent_for(host):
+    for suffix, agent in USER_AGENTS:
+        if host.endswith(suffix):
+            return agent
+    return DEFAULT_USER_AGENT
+
+
+def _pool(key):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = queue.LifoQueue()
+        return pool
+
+
+def _connect(scheme, host, timeout):
+    cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    return cls(host, timeout=timeout)
+
+
+def _checkout(scheme, host, timeout):
+    """Return (connection, reused) — an idle pooled connection if there is one."""
+    pool = _pool((scheme, host))
+    while True:
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            return _connect(scheme, host, timeout), False
+        conn.timeout = timeout
+        try:
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        except OSError:
+            conn.close()
+            continue
+        return conn, True
+
+
+def _checkin(scheme, host, conn):
+    pool = _pool((scheme, host))
+    if pool.qsize() >= MAX_IDLE_PER_HOST:
+        conn.close()
+    else:
+        pool.put(conn)
+
+
+def close_all():
+    """Close every pooled connection."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def _record(host, method, status, seconds, size, reused):
+    with _records_lock:
+        records.append((host, method, status, seconds, size, reused))
+
+
+class _StreamBody:
+    """File-like body for stream=True; the connection is closed, not pooled, afterwards.
+
+    The request is recorded on close, with the bytes actually read.
+    """
+
+    def __init__(self, conn, response, decoded, record):
+        self._conn = conn
+        self._response = response
+        self._decoded = decoded
+        self._record = record
+        self._size = 0
+
+    def read(self, size=-1):
+        data = self._decoded.read(size)
+        self._size += len(data)
+        return data
+
+    def close(self):
+        if self._record is not None:
+            self._record(self._size)
+            self._record = None
+        self._response.close()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _decode(body, encoding):
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    return body
+
+
+def _retry_after(headers):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (email.utils.parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def request(method, url, params=None, body=None, headers=None, timeout=None, stream=False):
+    """Send a request over a pooled connection and return a Response.
+
+    The host's rate_limit limiter is acquired first and told how the
+    request went. Throttling (429, or 503 with Retry-After), 5xx replies, timeouts and
+    connection errors are retried up to MAX_RETRIES times, waiting for
+    Retry-After when the server sends one and backing off exponentially
+    otherwise; other 4xx replies raise HTTPError straight away. Raises
+    rate_limit.HostUnavailable once the host's circuit breaker is open.
+
+    With `stream`, the body is left unread: resp.stream is a file-like
+    object the caller must close.
+    """
+    if params:
+        url = f"{url}{'&' if '?' in url else '?'}{urllib.parse.urlencode(params)}"
+    timeout = timeout or DEFAULT_TIMEOUT
+    host = urllib.parse.urlsplit(url).netloc
+    limiter = rate_limit.for_host(url)
+
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        start = time.perf_counter()
+        wait = None
+        try:
+            response = _send(method, url, body, headers, timeout, stream)
+        except HTTPError as e:
+            error = e
+            retry_after = _retry_after(e.headers)
+            # A 503 without Retry-After is more likely an outage than throttling.
+            if e.status == 429 or (e.status == 503 and retry_after is not None):
+                wait = retry_after
+                limiter.throttled(wait)
+            elif e.status >= 500:
+                limiter.failed(final=attempt == MAX_RETRIES)
+            else:
+                limiter.succeeded()  # the host is fine; the request isn't
+                raise
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+            limiter.failed(final=attempt == MAX_RETRIES)
+            _record(host, method, None, time.perf_counter() - start, 0, False)
+        else:
+            limiter.succeeded()
+            return response
+
+        if attempt == MAX_RETRIES:
+            break
+        with _records_lock:
+            retries[host] = retries.get(host, 0) + 1
+        if wait is None:
+            # Retry-After waits happen inside limiter.acquire().
+            time.sleep(BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5))
+    raise error
+
+
+def _send(method, url, body, headers, timeout, stream):
+    """One request (following redirects) with no retries."""
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        host = parts.netloc
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        send_headers = {
+            "Host": host,
+            "User-Agent": user_agent_for(parts.hostname or host),
+            "Accept-Encoding": "gzip",
+        }
+        send_headers.update(headers or {})
+
+        start = time.perf_counter()
+        conn, reused = _checkout(parts.scheme, host, timeout)
+        try:
+            conn.request(method, path, body=body, headers=send_headers)
+            response = conn.getresponse()
+        except _STALE_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # The server dropped an idle connection; retry once on a fresh one.
+            conn, reused = _connect(parts.scheme, host, timeout), False
+            try:
+                conn.request(method, path, body=body, headers=send_headers)
+                response = conn.getresponse()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+
+        status = response.status
+        encoding = (response.getheader("Content-Encoding") or "").lower()
+
+        if status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+            response.read()
+            if response.will_close:
+                conn.close()
+            else:
+                _checkin(parts.scheme, host, conn)
+            _record(host, method, status, time.perf_counter() - start, 0, reused)
+            url = urllib.parse.urljoin(url, response.getheader("Location"))
+            if status == 303:
+                method, body = "GET", None
+            continue
+
+        if stream and status < 400:
+            decoded = gzip.GzipFile(fileobj=response) if encoding == "gzip" else response
+            elapsed = time.perf_counter() - start
+
+            def record(size, host=host, status=status, elapsed=elapsed, reused=reused):
+                _record(host, method, status, elapsed, size, reused)
+            return Response(status, url, response.headers,
+                            stream=_StreamBody(conn, response, decoded, record), elapsed=elapsed)
+
+        try:
+            raw = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            _checkin(parts.scheme, host, conn)
+
+        elapsed = time.perf_counter() - start
+        _record(host, method, status, elapsed, len(raw), reused)
+        data = _decode(raw, encoding)
+        if status >= 400:
+            raise HTTPError(status, url, response.headers, data)
+        return Response(status, url, response.headers, body=data, elapsed=elapsed)
+
+    raise HTTPError(status, url, response.headers)
+
+
+def get(url, params=None, headers=None, timeout=None, stream=False):
+    return request("GET", url, params=params, headers=headers, timeout=timeout, stream=stream)
+
+
+def post(url, body, headers=None, timeout=None):
+    return request("POST", url, body=body, headers=headers, timeout=timeout)
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def latency_summary():
+    """Per-host requests, errors, retries, bytes, reused connections and latency percentiles (ms)."""
+    with _records_lock:
+        snapshot = list(records)
+        retried = dict(retries)
+    by_host = {}
+    for host, _, status, seconds, size, reused in snapshot:
+        by_host.setdefault(host, []).append((seconds, size, reused, status))
+    summary = {}
+    for host, rows in sorted(by_host.items()):
+        times = sorted(r[0] for r in rows)
+        summary[host] = {
+            "requests": len(rows),
+            "errors": sum(1 for r in rows if r[3] is None or r[3] >= 400),
+            "retries": retried.get(host, 0),
+            "bytes": sum(r[1] for r in rows),
+            "reused": sum(1 for r in rows if r[2]),
+            "p50_ms": round(_percentile(times, 0.50) * 1000, 1),
+            "p90_ms": round(_percentile(times, 0.90) * 1000, 1),
+            "p99_ms": round(_percentile(times, 0.99) * 1000, 1),
+            "max_ms": round(times[-1] * 1000, 1),
+        }
+    return summary
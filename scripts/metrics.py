@@ -0,0 +1,117 @@
+"""
+Lightweight run metrics behind --metrics / --profile.
+
+Printed progress lines can't tell whether a slow weekly run was Wikidata,
+JustWatch or Apple. With --metrics out.json a script writes, on exit:
+
+    stages   wall time (and entry count) per named stage
+    hosts    per upstream host: requests, errors, retries, response bytes,
+             reused connections and p50/p90/p99/max latency (http_client)
+    limiters each host's final adaptive rate and throttle/failure counts
+    cache    http_cache hits, misses, stores and evictions
+    peakMemoryBytes   tracemalloc peak (tracing is only on with --metrics)
+
+--profile out.prof additionally runs the main thread under cProfile
+(inspect with `python3 -m pstats out.prof`).
+
+Stages nest and may run concurrently; library code times itself with
+metrics.stage() whether or not --metrics was given, since the cost is two
+clock reads.
+
+Usage:
+    import metrics
+
+    metrics.add_metrics_args(parser)    # --metrics, --profile
+    args = parser.parse_args()
+    metrics.start("fetch_streaming_availability", args)
+    with metrics.stage("lookup"):
+        ...
+"""
+
+import atexit
+import cProfile
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import http_cache
+import http_client
+import rate_limit
+
+_stages = {}
+_stages_lock = threading.Lock()
+
+
+def add_metrics_args(parser):
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Write stage timings, per-host request stats, cache hits and peak memory as JSON")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Write cProfile stats for the main thread (python3 -m pstats PATH)")
+
+
+def record_stage(name, seconds):
+    with _stages_lock:
+        entry = _stages.setdefault(name, {"seconds": 0.0, "count": 0})
+        entry["seconds"] += seconds
+        entry["count"] += 1
+
+
+@contextmanager
+def stage(name):
+    """Time the block as stage `name` (accumulated across entries)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def report(script, started, wall):
+    with _stages_lock:
+        stages = {name: {"seconds": round(e["seconds"], 3), "count": e["count"]}
+                  for name, e in sorted(_stages.items())}
+    return {
+        "script": script,
+        "startedAt": started,
+        "wallSeconds": round(wall, 3),
+        "stages": stages,
+        "hosts": http_client.latency_summary(),
+        "limiters": {
+            host: {"rate": round(limiter.rate, 2), **limiter.stats}
+            for host, limiter in sorted(rate_limit.limiters().items())
+        },
+        "cache": dict(http_cache.stats),
+        "peakMemoryBytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+    }
+
+
+def start(script, args):
+    """Begin collecting for this run; the report and profile are written at exit."""
+    metrics_path = getattr(args, "metrics", None)
+    profile_path = getattr(args, "profile", None)
+    if not (metrics_path or profile_path):
+        return
+
+    started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    t0 = time.perf_counter()
+    if metrics_path:
+        tracemalloc.start()
+    profiler = None
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if metrics_path:
+            data = report(script, started, time.perf_counter() - t0)
+            tracemalloc.stop()
+            with open(metrics_path, "w") as f:
+                json.dump(data, f, indent=2)
+                f.write("\n")
+    atexit.register(finish)
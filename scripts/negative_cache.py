@@ -0,0 +1,94 @@
+"""
+Remembers lookups that found nothing, so they aren't repeated every run.
+
+A film JustWatch has no AU offers for, or an episode Apple Podcasts can't
+match, used to be looked up again on every run forever. Each miss is now
+recorded per source and episode id in .cache/negative_cache.json with a
+re-check date that backs off exponentially: one week after the first miss,
+then two, four, ... up to MAX_BACKOFF_DAYS. A later hit clears the entry.
+
+Dates are compared at day granularity so a weekly job that runs a few
+minutes early still counts as due. Scripts own separate sources, and save()
+only rewrites the sources this process touched, so stages running in
+parallel don't drop each other's entries.
+
+Usage:
+    from negative_cache import NegativeCache
+
+    negatives = NegativeCache.load()
+    if negatives.is_due("justwatch", episode["id"]):
+        ...
+        negatives.record_miss("justwatch", episode["id"])   # or record_hit
+    negatives.save()
+"""
+
+import json
+from datetime import date, timedelta
+
+import http_cache
+from atomic_file import locked, write_atomic
+
+NEGATIVE_CACHE_PATH = http_cache.CACHE_DIR / "negative_cache.json"
+
+BASE_BACKOFF_DAYS = 7
+MAX_BACKOFF_DAYS = 90
+
+
+def backoff_days(misses):
+    """Days to wait before re-checking after `misses` consecutive misses."""
+    return min(BASE_BACKOFF_DAYS * 2 ** max(misses - 1, 0), MAX_BACKOFF_DAYS)
+
+
+class NegativeCache:
+    def __init__(self, data=None, path=NEGATIVE_CACHE_PATH):
+        self.path = path
+        self.data = data or {}
+        self.touched = set()
+
+    @classmethod
+    def load(cls, path=NEGATIVE_CACHE_PATH):
+        return cls(_read(path), path)
+
+    def entry(self, source, episode_id):
+        return self.data.get(source, {}).get(episode_id)
+
+    def is_due(self, source, episode_id, today=None):
+        """True unless a recorded miss is still inside its backoff window."""
+        entry = self.entry(source, episode_id)
+        if entry is None:
+            return True
+        today = today or date.today()
+        return today.isoformat() >= entry["retryAfter"]
+
+    def record_miss(self, source, episode_id, today=None):
+        today = today or date.today()
+        entries = self.data.setdefault(source, {})
+        misses = entries.get(episode_id, {}).get("misses", 0) + 1
+        entries[episode_id] = {
+            "misses": misses,
+            "lastChecked": today.isoformat(),
+            "retryAfter": (today + timedelta(days=backoff_days(misses))).isoformat(),
+        }
+        self.touched.add(source)
+
+    def record_hit(self, source, episode_id):
+        if self.data.get(source, {}).pop(episode_id, None) is not None:
+            self.touched.add(source)
+
+    def save(self):
+        if not self.touched:
+            return
+        with locked(self.path):
+            merged = _read(self.path)
+            for source in self.touched:
+                merged[source] = self.data.get(source, {})
+            write_atomic(self.path, json.dumps(merged, indent=2, sort_keys=True))
+        self.touched = set()
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
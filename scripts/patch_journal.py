@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Field-level patch journal for episodes.json.
+
+Each pipeline stage touches only a few fields (streaming/lastStreamingCheck,
+applePodcastsUrl, year/director/genres/studio) or inserts a new record, yet
+used to rewrite the whole file. With --journal, a stage instead appends its
+edits as one JSON line per patch to .cache/journal/<stage>.jsonl:
+
+    {"op": "set", "id": "heat", "field": "year", "old": null, "new": 1995, ...}
+    {"op": "insert", "id": "heat", "index": 0, "episode": {...}, ...}
+
+Stages write separate, append-only files, so they can run in parallel. This
+script's compaction pass then merges every journal into episodes.json in
+one load + save. A set patch applies when the field still holds its
+recorded "old" value (or already holds "new"); anything else is a conflict.
+Conflicting patches are moved to .cache/journal/conflicts.jsonl, reported,
+and the run exits 1.
+
+Usage:
+    python3 scripts/fetch_streaming_availability.py --journal
+    python3 scripts/fetch_apple_podcast_urls.py --journal
+    python3 scripts/patch_journal.py              # compact into episodes.json
+    python3 scripts/patch_journal.py --dry-run    # report only
+"""
+
+import argparse
+import json
+import time
+from contextlib import ExitStack
+
+import http_cache
+import metrics
+from atomic_file import locked
+from episode_store import EpisodeStore
+
+JOURNAL_DIR = http_cache.CACHE_DIR / "journal"
+CONFLICTS_PATH = JOURNAL_DIR / "conflicts.jsonl"
+
+# Stands in for "field not present" (set patches omit "old" in that case).
+_ABSENT = object()
+
+
+def add_journal_args(parser):
+    parser.add_argument("--journal", action="store_true",
+                        help="Append field-level patches to the journal instead of rewriting "
+                             "episodes.json (merge with scripts/patch_journal.py)")
+
+
+def journal_path(stage):
+    return JOURNAL_DIR / f"{stage}.jsonl"
+
+
+def append(stage, patches):
+    """Append patch records for `stage`; returns how many were written."""
+    if not patches:
+        return 0
+    path = journal_path(stage)
+    now = time.time()
+    lines = "".join(
+        json.dumps(dict(patch, stage=stage, ts=now), ensure_ascii=False) + "\n"
+        for patch in patches
+    )
+    with locked(path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+    return len(patches)
+
+
+def saver(store, args, stage):
+    """Return a zero-argument save function honouring --journal.
+
+    Without --journal it is store.save; with it, the store's unsaved edits
+    are appended to the stage's journal instead.
+    """
+    if not getattr(args, "journal", False):
+        return store.save
+
+    def save():
+        count = append(stage, store.take_patches())
+        if count:
+            print(f"  Journaled {count} patch(es) to {journal_path(stage)}")
+    return save
+
+
+def read_patches(paths):
+    """All patches from `paths`, oldest first (file order breaks timestamp ties)."""
+    patches = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    patches.append(json.loads(line))
+    patches.sort(key=lambda p: p.get("ts", 0))
+    return patches
+
+
+def apply_patch(store, patch):
+    """Apply one patch to the store. Returns False if it conflicts."""
+    episode = store.get(patch["id"])
+    if patch["op"] == "insert":
+        if episode is None:
+            store.insert(patch["episode"], patch.get("index", 0))
+            return True
+        return episode == patch["episode"]
+
+    if episode is None:
+        return False
+    current = episode.get(patch["field"], _ABSENT)
+    if current == patch["new"]:
+        return True  # already applied (e.g. by a rerun)
+    if current != patch.get("old", _ABSENT):
+        return False
+    store.set_field(episode, patch["field"], patch["new"])
+    return True
+
+
+def compact(dry_run=False):
+    """Merge every journal into episodes.json. Returns (applied, conflicts)."""
+    paths = sorted(p for p in JOURNAL_DIR.glob("*.jsonl") if p != CONFLICTS_PATH) if JOURNAL_DIR.exists() else []
+    if not paths:
+        return [], []
+
+    with ExitStack() as stack:
+        # Hold every journal's lock so no stage appends between read and delete.
+        for path in paths:
+            stack.enter_context(locked(path))
+        patches = read_patches(paths)
+
+        store = EpisodeStore.load()
+        applied, conflicts = [], []
+        for patch in patches:
+            (applied if apply_patch(store, patch) else conflicts).append(patch)
+
+        if dry_run:
+            return applied, conflicts
+
+        if applied:
+            store.save()
+        if conflicts:
+            with open(CONFLICTS_PATH, "a", encoding="utf-8") as f:
+                for patch in conflicts:
+                    f.write(json.dumps(patch, ensure_ascii=False) + "\n")
+        for path in paths:
+            path.unlink()
+    return applied, conflicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge journaled field patches into episodes.json")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be merged without writing")
+    metrics.add_metrics_args(parser)
+    args = parser.parse_args()
+    metrics.start("patch_journal", args)
+
+    with metrics.stage("compact"):
+        applied, conflicts = compact(dry_run=args.dry_run)
+    if not applied and not conflicts:
+        print("✓ Journal is empty")
+        return 0
+
+    stages = sorted({p.get("stage", "?") for p in applied + conflicts})
+    print(f"{'Would apply' if args.dry_run else 'Applied'} {len(applied)} patch(es) from {', '.join(stages)}")
+    for patch in conflicts:
+        where = patch["id"] if patch["op"] == "insert" else f"{patch['id']}.{patch['field']}"
+        print(f"  ✗ Conflict ({patch.get('stage', '?')}): {patch['op']} {where}")
+    if conflicts:
+        print(f"\n⚠️  {len(conflicts)} conflicting patch(es)"
+              + ("" if args.dry_run else f" moved to {CONFLICTS_PATH}"))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,168 @@
+"""
+Conditional fetching of the Megaphone podcast feed.
+
+The feed is several megabytes and almost never changes between polls, so we
+persist the ETag / Last-Modified validators from each successful run in
+.cache/feed_state.json and send them back as If-None-Match /
+If-Modified-Since. A 304 reply short-circuits the caller before any download
+or XML parsing happens.
+
+Validators are stored per consumer (one script's "last seen" must not hide
+new episodes from another) and only once the caller calls remember() after
+it has finished acting on the feed — a run that crashes halfway through
+re-downloads next time instead of wrongly reporting "no change".
+
+A 304 only says the feed is unchanged, not that the database still holds
+what it held when the validators were saved (it may since have been
+reverted or restored from an older commit). So each saved validator pair
+carries the database's EpisodeStore.fingerprint(), and the request is only
+conditional while the fingerprint still matches; otherwise the feed is
+downloaded and compared again. --no-cache / --refresh skip validators too.
+
+Callers that only need the newest few items should pass stream=True and
+read them through resp.items(limit): items are parsed incrementally with
+iterparse, detached from the tree once consumed, and the connection is
+closed as soon as enough items have been seen, instead of downloading and
+building the whole multi-megabyte document.
+
+Usage:
+    import podcast_feed
+
+    resp = podcast_feed.fetch(FEED_URL, consumer="add_new_episode", stream=True,
+                              fingerprint=store.fingerprint())
+    if resp.not_modified:
+        return
+    for item in resp.items(limit=5):
+        ...
+    podcast_feed.remember(resp, store.fingerprint())
+"""
+
+import io
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import http_cache
+import http_client
+import metrics
+
+# Base URLs can be pointed at scripts/fake_upstreams.py through the environment.
+FEED_URL = os.environ.get("FEED_URL", "https://feeds.megaphone.fm/the-rewatchables")
+STATE_PATH = http_cache.CACHE_DIR / "feed_state.json"
+
+
+class FeedResponse:
+    def __init__(self, url, consumer, body=None, stream=None, etag=None, last_modified=None):
+        self.url = url
+        self.consumer = consumer
+        self.body = body
+        self.stream = stream
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self):
+        return self.body is None and self.stream is None
+
+    def items(self, limit=None):
+        """Yield <item> elements in feed order, stopping after `limit`."""
+        if self.not_modified:
+            return
+        source = self.stream if self.stream is not None else io.BytesIO(self.body)
+        try:
+            yield from iter_items(source, limit)
+        finally:
+            if self.stream is not None:
+                self.stream.close()
+
+
+def iter_items(source, limit=None):
+    """Incrementally parse RSS from a file-like `source`, yielding each <item>.
+
+    Each item is removed from <channel> once the consumer moves past it, so
+    memory stays flat however long the feed is; callers that kept a
+    reference still hold the complete element. Reading stops as soon as
+    `limit` items have been yielded.
+    """
+    if limit is not None and limit <= 0:
+        return
+    channel = None
+    count = 0
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "channel":
+                channel = elem
+            continue
+        if elem.tag != "item":
+            continue
+        yield elem
+        if channel is not None:
+            channel.remove(elem)
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+
+def _load_state():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _state_key(url, consumer):
+    return f"{consumer} {url}"
+
+
+def fetch(url=FEED_URL, consumer="default", conditional=True, timeout=30, stream=False, fingerprint=None):
+    """GET the feed, sending stored validators when `conditional` is set.
+
+    Validators are skipped under --no-cache / --refresh so those flags still
+    force a full download, and when `fingerprint` differs from the one they
+    were remembered with. With `stream`, the body is left unread on the
+    open connection for FeedResponse.items() to consume incrementally.
+    """
+    headers = {}
+    if conditional and http_cache.mode() == "on":
+        saved = _load_state().get(_state_key(url, consumer), {})
+        if saved.get("fingerprint") != fingerprint:
+            saved = {}
+        if saved.get("etag"):
+            headers["If-None-Match"] = saved["etag"]
+        if saved.get("lastModified"):
+            headers["If-Modified-Since"] = saved["lastModified"]
+
+    with metrics.stage("feed.fetch"):
+        response = http_client.get(url, headers=headers, timeout=timeout, stream=stream)
+    if response.status == 304:
+        if response.stream is not None:
+            response.stream.close()
+        return FeedResponse(url, consumer)
+
+    return FeedResponse(
+        url, consumer,
+        body=response.body,
+        stream=response.stream,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+
+
+def remember(resp, fingerprint=None):
+    """Persist the response's validators so the next poll can get a 304.
+
+    `fingerprint` is the database state the caller has brought up to date
+    with the feed; the validators are only used while it still matches.
+    """
+    if resp.not_modified or not (resp.etag or resp.last_modified):
+        return
+    state = _load_state()
+    state[_state_key(resp.url, resp.consumer)] = {
+        "etag": resp.etag,
+        "lastModified": resp.last_modified,
+        "fingerprint": fingerprint,
+    }
+    http_cache.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(STATE_PATH, "w") as f:
+        json.dump(state, f, indent=2)
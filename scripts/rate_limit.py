@@ -0,0 +1,185 @@
+"""
+Thread-safe, self-tuning rate limiting, one limiter per upstream host.
+
+Scripts that fan requests out over a thread pool share a single limiter per
+host, so concurrency only overlaps network latency and never pushes the
+request rate past what the upstream tolerates.
+
+Rates used to be hand-tuned sleeps. Each host's limiter now finds its own
+rate with AIMD: every successful request nudges the rate up by a small
+step, and a 429/503 or a failed attempt halves it. A Retry-After from the
+server pauses the whole host until then. After FAILURE_THRESHOLD
+consecutive requests fail outright (connection errors, timeouts, 5xx on
+every retry) the circuit breaker opens and acquire() raises
+HostUnavailable for a cool-down, so a run against a host that is down
+fails fast instead of reporting every title as "not found". Retries of one
+request count once, so a single bad URL can't open the breaker. When the
+cool-down ends one probe request is let through; its outcome closes the
+breaker or reopens it for twice as long.
+
+http_client drives the limiters (acquire before each request, then
+succeeded / throttled / failed), so scripts only pick a starting rate when
+they want one other than HOST_LIMITS.
+
+Usage:
+    from rate_limit import for_host
+
+    limiter = for_host(JUSTWATCH_GRAPHQL, rate=5.0)   # optional starting rate
+    limiter.acquire()    # blocks until a token is available
+"""
+
+import threading
+import time
+import urllib.parse
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# (starting rate, min rate, max rate) in requests/second per host; AIMD
+# moves each host's rate within its bounds. Unlisted hosts get DEFAULT_LIMITS.
+HOST_LIMITS = {
+    "itunes.apple.com": (0.5, 0.1, 2.0),
+    "apis.justwatch.com": (4.0, 0.5, 20.0),
+    "en.wikipedia.org": (2.0, 0.25, 10.0),
+    "www.wikidata.org": (2.0, 0.25, 10.0),
+}
+DEFAULT_LIMITS = (5.0, 0.5, 20.0)
+
+# Each success raises the rate by this fraction of the starting rate.
+INCREASE_FRACTION = 0.05
+FAILURE_THRESHOLD = 5
+COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+
+class HostUnavailable(Exception):
+    """The host's circuit breaker is open after repeated failures."""
+
+
+class AdaptiveLimiter(TokenBucket):
+    """Token bucket whose rate follows upstream feedback, with a circuit breaker."""
+
+    def __init__(self, host, rate, burst=1, min_rate=None, max_rate=None):
+        super().__init__(rate, burst)
+        self.host = host
+        self.min_rate = min(min_rate or rate / 8, rate)
+        self.max_rate = max(max_rate or rate * 4, rate)
+        self.increase = rate * INCREASE_FRACTION
+        self.cooldown = COOLDOWN
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._paused_until = 0.0
+        self.stats = {"throttled": 0, "failures": 0, "trips": 0}
+
+    def acquire(self, tokens=1):
+        """Wait out any Retry-After pause, then take a token.
+
+        Raises HostUnavailable while the breaker is open.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._failures >= FAILURE_THRESHOLD:
+                    if self._probing or now < self._open_until:
+                        raise HostUnavailable(
+                            f"{self.host} is unavailable after {self._failures} consecutive failures")
+                    self._probing = True
+                wait = self._paused_until - now
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        super().acquire(tokens)
+
+    def _set_rate(self, rate):
+        self._refill(time.monotonic())
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+
+    def succeeded(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self.cooldown = COOLDOWN
+            self._set_rate(self.rate + self.increase)
+
+    def throttled(self, retry_after=None):
+        """The host answered 429/503: halve the rate and honour Retry-After (seconds)."""
+        with self._lock:
+            self._probing = False
+            self.stats["throttled"] += 1
+            self._set_rate(self.rate / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def failed(self, final=True):
+        """The request errored (connection, timeout, 5xx); trip the breaker if it keeps happening.
+
+        Every failed attempt halves the rate, but only a `final` one (the
+        request is giving up) counts toward FAILURE_THRESHOLD. A failed probe
+        always counts, reopening the breaker.
+        """
+        with self._lock:
+            self.stats["failures"] += 1
+            self._set_rate(self.rate / 2)
+            if not (final or self._probing):
+                return
+            self._failures += 1
+            if self._failures < FAILURE_THRESHOLD:
+                return
+            if self._probing:
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            self._probing = False
+            self._open_until = time.monotonic() + self.cooldown
+            self.stats["trips"] += 1
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def for_host(url, rate=None, burst=1):
+    """Return the shared limiter for `url`'s host, creating it on first use.
+
+    `rate` overrides the starting rate from HOST_LIMITS; it only takes
+    effect if this call creates the limiter.
+    """
+    host = urllib.parse.urlsplit(url).netloc
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            start, low, high = HOST_LIMITS.get(host, DEFAULT_LIMITS)
+            limiter = _limiters[host] = AdaptiveLimiter(host, rate or start, burst, low, high)
+        return limiter
+
+
+def limiters():
+    """Snapshot of every host limiter created so far."""
+    with _limiters_lock:
+        return dict(_limiters)
@@ -13,10 +13,11 @@ Usage:
     python scripts/streaming_audit.py --stale 30        # Movies not checked in 30+ days
 """
 
-import json
 import argparse
 from datetime import datetime, timedelta
-from pathlib import Path
+
+import metrics
+from episode_store import EpisodeStore
 
 # Studio to native streamer mapping
 # These studios' content is "locked" to specific streamers and rarely moves
@@ -56,16 +57,6 @@ LICENSED_STUDIOS = [
 ]
 
 
-def load_episodes():
-    """Load episodes from JSON file."""
-    script_dir = Path(__file__).parent
-    data_file = script_dir.parent / "src" / "data" / "episodes.json"
-
-    with open(data_file, 'r') as f:
-        data = json.load(f)
-    return data['episodes']
-
-
 def get_stale_movies(episodes, days=30):
     """Get movies that haven't been checked in X days."""
     cutoff = datetime.now() - timedelta(days=days)
@@ -133,10 +124,10 @@ def get_native_content(episodes):
     return native
 
 
-def get_stats(episodes):
+def get_stats(store):
     """Get statistics about the database."""
     stats = {
-        'total': len(episodes),
+        'total': len(store),
         'by_studio': {},
         'by_service': {
             'netflix': 0,
@@ -152,26 +143,25 @@ def get_stats(episodes):
         'licensed_count': 0,
     }
 
-    for ep in episodes:
-        studio = ep.get('studio', 'unknown')
-        stats['by_studio'][studio] = stats['by_studio'].get(studio, 0) + 1
+    # Counts come straight off the store's studio/service indexes.
+    for studio, count in store.studios().items():
+        stats['by_studio'][studio] = stats['by_studio'].get(studio, 0) + count
 
         if studio in NATIVE_STREAMING:
-            stats['native_count'] += 1
+            stats['native_count'] += count
         else:
-            stats['licensed_count'] += 1
+            stats['licensed_count'] += count
 
-        for service, available in ep['streaming'].items():
-            if service != 'rentBuy' and available:
-                stats['by_service'][service] = stats['by_service'].get(service, 0) + 1
+    for service, count in store.service_counts().items():
+        stats['by_service'][service] = count
 
     return stats
 
 
-def print_audit_list(episodes):
+def print_audit_list(store):
     """Print list of movies needing audit (licensed content only)."""
-    licensed = get_licensed_content(episodes)
-    stale = get_stale_movies([ep for ep in episodes if ep.get('studio', 'unknown') in LICENSED_STUDIOS], days=30)
+    licensed = get_licensed_content(store)
+    stale = get_stale_movies([ep for ep in store if ep.get('studio', 'unknown') in LICENSED_STUDIOS], days=30)
 
     print("=" * 60)
     print("MONTHLY STREAMING AUDIT - LICENSED CONTENT")
@@ -187,9 +177,9 @@ def print_audit_list(episodes):
         print(f"\n  ... and {len(stale) - 50} more")
 
 
-def print_stats(episodes):
+def print_stats(store):
     """Print database statistics."""
-    stats = get_stats(episodes)
+    stats = get_stats(store)
 
     print("=" * 60)
     print("DATABASE STATISTICS")
@@ -233,21 +223,23 @@ def main():
     parser.add_argument('--stats', action='store_true', help='Show database statistics')
     parser.add_argument('--native', action='store_true', help='Show native content status')
     parser.add_argument('--stale', type=int, metavar='DAYS', help='Show movies not checked in X days')
+    metrics.add_metrics_args(parser)
 
     args = parser.parse_args()
-    episodes = load_episodes()
+    metrics.start("streaming_audit", args)
+    store = EpisodeStore.load()
 
     if args.stats:
-        print_stats(episodes)
+        print_stats(store)
     elif args.native:
-        print_native_content(episodes)
+        print_native_content(store)
     elif args.stale:
-        stale = get_stale_movies(episodes, days=args.stale)
+        stale = get_stale_movies(store, days=args.stale)
         print(f"\n{len(stale)} movies not checked in {args.stale}+ days:\n")
         for movie in stale[:50]:
             print(f"  [{movie['days_old']:3d}d] {movie['title']} ({movie['studio']})")
     else:
-        print_audit_list(episodes)
+        print_audit_list(store)
 
 
 if __name__ == '__main__':
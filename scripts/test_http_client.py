@@ -0,0 +1,64 @@
+"""
+Retry and circuit-breaker behaviour of http_client against a local server.
+
+Usage:
+    python3 -m unittest discover -s scripts -p "test_*.py"
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_client
+import rate_limit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """/bad always answers 500; anything else answers 200."""
+
+    def do_GET(self):
+        status = 500 if self.path.startswith("/bad") else 200
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.limiter = rate_limit.for_host(self.base, rate=1000.0)
+        self.limiter.min_rate = 1000.0  # failures would otherwise slow the test to a crawl
+        self.backoff = http_client.BACKOFF_BASE
+        http_client.BACKOFF_BASE = 0.0
+
+    def tearDown(self):
+        http_client.BACKOFF_BASE = self.backoff
+        http_client.close_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_one_bad_url_does_not_stop_the_host(self):
+        with self.assertRaises(http_client.HTTPError):
+            http_client.get(f"{self.base}/bad")
+        self.assertEqual(self.limiter.stats["failures"], http_client.MAX_RETRIES + 1)
+        self.assertEqual(self.limiter.stats["trips"], 0)
+        self.assertEqual(http_client.get(f"{self.base}/good").status, 200)
+
+    def test_repeated_failing_requests_open_the_breaker(self):
+        for _ in range(rate_limit.FAILURE_THRESHOLD):
+            with self.assertRaises(http_client.HTTPError):
+                http_client.get(f"{self.base}/bad")
+        self.assertEqual(self.limiter.stats["trips"], 1)
+        with self.assertRaises(rate_limit.HostUnavailable):
+            http_client.get(f"{self.base}/good")
+
+
+if __name__ == "__main__":
+    unittest.main()
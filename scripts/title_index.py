@@ -0,0 +1,174 @@
+"""
+Shared film-title normalization and fuzzy matching.
+
+Every place that compares titles goes through normalize(): the store's
+title index (and so dedupe in check_new_episodes, add_new_episode and
+fetch_new_episodes), JustWatch matching and Apple Podcasts matching.
+"Devil’s Advocate", "Devil's Advocate" and "DEVILS ADVOCATE" land on the
+same key everywhere. Normalization is memoized, since the same titles are
+normalized again for every candidate they're compared against.
+
+TitleIndex precomputes keys plus word and trigram postings for a
+collection once:
+
+    exact(title)       items whose key equals the title's key
+    containing(title)  items whose key contains every word of the title
+    substring(text)    items whose fold() contains fold(text) anywhere,
+                       mid-word included ("rock" finds "Rocky")
+    search(title)      (score, item) pairs ranked by trigram similarity
+
+search() scores only items that share one of the query's rarest trigrams
+(prefix filtering: anything similar enough must share at least one of
+them), so a lookup touches a small slice of the catalog instead of every
+title.
+
+Usage:
+    from title_index import TitleIndex, normalize
+
+    index = TitleIndex(store.episodes, key=lambda ep: ep["title"])
+    for score, ep in index.search("Devils Advocate", min_score=0.8):
+        ...
+"""
+
+import math
+import re
+import unicodedata
+from functools import lru_cache
+
+CACHE_SIZE = 65536
+
+_QUOTES_RE = re.compile(r"[‘’“”'\"`´]")
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fold(title):
+    """Lowercase and drop every quote character.
+
+    Apple wraps film names in quotes ('Good Will Hunting' Live From Boston),
+    and titles mix typographic and straight apostrophes; dropping them all
+    turns "Devil’s Advocate" and "Devil's Advocate" into "devils advocate".
+    Other punctuation is kept (Apple matching still looks at it).
+    """
+    return _QUOTES_RE.sub("", (title or "").lower())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(title):
+    """Comparison key: fold(), accents stripped, "&" → "and", other punctuation → single spaces."""
+    s = unicodedata.normalize("NFKD", fold(title))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = s.replace("&", " and ")
+    return _NON_WORD_RE.sub(" ", s).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def trigrams(title):
+    """Character trigrams of the normalized title, padded so word starts count."""
+    key = normalize(title)
+    if not key:
+        return frozenset()
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _raw_trigrams(s):
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def similarity(a, b):
+    """Trigram similarity of two titles, from 0.0 (nothing shared) to 1.0 (same key)."""
+    return _dice(trigrams(a), trigrams(b))
+
+
+class TitleIndex:
+    """Normalized keys with exact, word and trigram postings over a collection.
+
+    `key` maps an item to its title (default: the item is the title).
+    Results come back in insertion order, or best score first for search().
+    """
+
+    def __init__(self, items=(), key=None):
+        self._key = key or (lambda item: item)
+        self.items = []
+        self._grams = []
+        self._folded = []
+        self._exact = {}
+        self._words = {}
+        self._trigrams = {}
+        self._fold_trigrams = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        n = len(self.items)
+        title = self._key(item)
+        grams = trigrams(title)
+        self.items.append(item)
+        self._grams.append(grams)
+        folded = fold(title)
+        self._folded.append(folded)
+        for gram in _raw_trigrams(folded):
+            self._fold_trigrams.setdefault(gram, set()).add(n)
+        key = normalize(title)
+        self._exact.setdefault(key, []).append(n)
+        for word in set(key.split()):
+            self._words.setdefault(word, set()).add(n)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(n)
+
+    def exact(self, title):
+        return [self.items[n] for n in self._exact.get(normalize(title), [])]
+
+    def containing(self, title):
+        words = set(normalize(title).split())
+        if not words:
+            return []
+        postings = sorted((self._words.get(w, set()) for w in words), key=len)
+        matches = set.intersection(*postings)
+        return [self.items[n] for n in sorted(matches)]
+
+    def substring(self, text):
+        # Every trigram of the needle occurs in any string containing it, so
+        # the postings narrow the scan; `in` then confirms each candidate.
+        needle = fold(text)
+        grams = _raw_trigrams(needle)
+        if grams:
+            postings = sorted((self._fold_trigrams.get(g, set()) for g in grams), key=len)
+            candidates = sorted(set.intersection(*postings))
+        else:
+            candidates = range(len(self.items))
+        return [self.items[n] for n in candidates if needle in self._folded[n]]
+
+    def search(self, title, limit=5, min_score=0.5):
+        grams = trigrams(title)
+        if not grams:
+            return []
+        # Dice >= min_score needs at least `need` shared trigrams, and any item
+        # sharing that many shares one of the len(grams) - need + 1 rarest.
+        need = max(1, math.ceil(min_score * len(grams) / (2 - min_score)))
+        rarest = sorted(grams, key=lambda g: len(self._trigrams.get(g, ())))
+        candidates = set()
+        for gram in rarest[:len(grams) - need + 1]:
+            candidates.update(self._trigrams.get(gram, ()))
+
+        # Dice >= min_score also bounds the other title's trigram count.
+        low = len(grams) * min_score / (2 - min_score)
+        high = len(grams) * (2 - min_score) / min_score if min_score else math.inf
+        scored = []
+        for n in candidates:
+            other = self._grams[n]
+            if not low <= len(other) <= high:
+                continue
+            score = _dice(grams, other)
+            if score >= min_score:
+                scored.append((score, n))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [(round(score, 3), self.items[n]) for score, n in scored[:limit]]
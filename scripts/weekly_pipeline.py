@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Run the weekly add → enrich → streaming → Apple flow in one process.
+
+The weekly job used to run four scripts back to back, each re-parsing and
+rewriting episodes.json and scanning all ~460 episodes to find the new ones.
+This entry point loads the store once, adds new feed episodes, and hands
+only the new ids to the downstream stages, which run as a small DAG on a
+thread pool:
+
+    add ── enrich (Wikidata) ──┬── streaming (JustWatch)
+                               └── apple (Apple Podcasts)
+
+JustWatch and Apple matching both lean on the year Wikidata fills in for
+new episodes, so they wait for enrich and then run alongside each other. Stages do their network work
+concurrently and apply results to the shared store under one lock. The
+store is written once at the end, and a JSON summary is printed to stdout
+(progress logs go to stderr).
+
+Usage:
+    python3 scripts/weekly_pipeline.py
+    python3 scripts/weekly_pipeline.py --count 5 --summary summary.json
+    python3 scripts/weekly_pipeline.py --ids heat,collateral   # skip the feed, rerun downstream stages
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
+
+import add_new_episode
+import enrich_metadata
+import fetch_apple_podcast_urls
+import fetch_streaming_availability
+import http_cache
+import metrics
+import podcast_feed
+from episode_store import EpisodeStore, has_streaming
+from negative_cache import NegativeCache
+
+# Downstream stage → stages that must finish first. A stage still runs if
+# one of its dependencies failed; it just works with what's in the store.
+STAGE_DEPS = {
+    "enrich": [],
+    "apple": ["enrich"],
+    "streaming": ["enrich"],
+}
+
+
+class Context:
+    """State shared by the stages of one run."""
+
+    def __init__(self, store, episode_ids, args):
+        self.store = store
+        self.episode_ids = episode_ids
+        self.args = args
+        self.lock = threading.Lock()
+        self.negatives = NegativeCache.load()
+
+    def episodes(self):
+        return [self.store.get(i) for i in self.episode_ids if self.store.has_id(i)]
+
+
+def add_stage(store, count):
+    """Insert episodes from the newest `count` feed items that aren't in the store.
+
+    Returns (added episode dicts, feed response to remember once saved).
+    """
+    resp = podcast_feed.fetch(consumer="weekly_pipeline", stream=True, fingerprint=store.fingerprint())
+    if resp.not_modified:
+        print("✓ Feed unchanged since last run")
+        return [], resp
+
+    feed_items = list(resp.items(limit=count))
+    added = []
+    for parsed_ep in add_new_episode.find_missing_episodes(feed_items, store, limit=count):
+        episode = add_new_episode.create_episode_object(parsed_ep)
+        if store.has_id(episode["id"]):
+            episode["id"] = f"{episode['id']}-{parsed_ep['date']}"
+        store.insert(episode)
+        added.append(episode)
+    print(f"Added {len(added)} episode(s)")
+    return added, resp
+
+
+def enrich_stage(ctx):
+    episodes = [ep for ep in ctx.episodes() if enrich_metadata.is_skeleton(ep)]
+    items = [(ep["title"], enrich_metadata.strip_episode_suffixes(ep["title"]), ep.get("year"))
+             for ep in episodes]
+    results = enrich_metadata.lookup_films(items, ctx.args.workers) if items else []
+
+    enriched, not_found, failed = [], [], []
+    with ctx.lock:
+        for episode, result in zip(episodes, results):
+            if result == enrich_metadata.LOOKUP_FAILED:
+                failed.append(episode["id"])
+                continue
+            if not result:
+                not_found.append(episode["id"])
+                continue
+            qid, page, wd = result
+            parts = enrich_metadata.apply_metadata(ctx.store, episode, wd, qid)
+            print(f"  ✓ {episode['title']} → {page} [{qid}] — {', '.join(parts)}")
+            enriched.append(episode["id"])
+    return {"updated": enriched, "notFound": not_found, "failed": failed}
+
+
+def streaming_stage(ctx):
+    fsa = fetch_streaming_availability
+    episodes = ctx.episodes()
+    batch_size = fsa.DEFAULT_BATCH_SIZE
+
+    updated, not_found, failed = [], [], []
+    for n in range(0, len(episodes), batch_size):
+        batch = episodes[n:n + batch_size]
+        nodes = fsa.lookup_episodes(batch)
+        with ctx.lock:
+            for offset, (episode, node) in enumerate(zip(batch, nodes)):
+                if node == fsa.LOOKUP_FAILED:
+                    failed.append(episode["id"])
+                    continue
+                fsa.apply_result(ctx.store, episode, node, n + offset, len(episodes))
+                (updated if node else not_found).append(episode["id"])
+                if node and has_streaming(episode.get("streaming")):
+                    ctx.negatives.record_hit(fsa.NEGATIVE_SOURCE, episode["id"])
+                else:
+                    ctx.negatives.record_miss(fsa.NEGATIVE_SOURCE, episode["id"])
+    return {"updated": updated, "notFound": not_found, "failed": failed}
+
+
+def apple_stage(ctx):
+    fap = fetch_apple_podcast_urls
+    updated, unchanged, not_found, failed = [], [], [], []
+    for episode in ctx.episodes():
+        try:
+            url, _ = fap.find_episode_url(episode["title"], episode.get("year"))
+        except Exception as e:
+            print(f"  ✗ Apple: lookup failed for {episode['title']}: {e}")
+            failed.append(episode["id"])
+            continue
+        with ctx.lock:
+            if url:
+                ctx.negatives.record_hit(fap.NEGATIVE_SOURCE, episode["id"])
+                if url == episode.get("applePodcastsUrl", ""):
+                    print(f"  = Apple: {episode['title']} unchanged")
+                    unchanged.append(episode["id"])
+                    continue
+                ctx.store.set_field(episode, "applePodcastsUrl", url)
+                print(f"  ✓ Apple: {episode['title']} → i={url.split('?i=')[-1][:18]}")
+                updated.append(episode["id"])
+            else:
+                ctx.negatives.record_miss(fap.NEGATIVE_SOURCE, episode["id"])
+                print(f"  ✗ Apple: no confident match for {episode['title']}")
+                not_found.append(episode["id"])
+    return {"updated": updated, "unchanged": unchanged, "notFound": not_found, "failed": failed}
+
+
+STAGES = {
+    "enrich": enrich_stage,
+    "apple": apple_stage,
+    "streaming": streaming_stage,
+}
+
+
+def _run_stage(name, fn, ctx):
+    start = time.perf_counter()
+    try:
+        result = {"status": "ok", **fn(ctx)}
+    except Exception as e:
+        print(f"  ✗ Stage {name} failed: {e}")
+        result = {"status": "failed", "error": str(e)}
+    seconds = time.perf_counter() - start
+    metrics.record_stage(name, seconds)
+    result["seconds"] = round(seconds, 3)
+    return result
+
+
+def run_dag(ctx, stages=STAGES, deps=STAGE_DEPS):
+    """Run each stage as soon as its dependencies have finished. Returns {stage: result}.
+
+    Raises ValueError if some stages can never run (a missing or cyclic
+    dependency).
+    """
+    results = {}
+    pending = {name: deps.get(name, []) for name in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+        while pending or running:
+            for name in [n for n, d in pending.items() if all(dep in results for dep in d)]:
+                del pending[name]
+                running[pool.submit(_run_stage, name, stages[name], ctx)] = name
+            if not running:
+                blocked = ", ".join(f"{n} (needs {', '.join(d)})" for n, d in pending.items())
+                raise ValueError(f"Stage dependencies can never be satisfied: {blocked}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+
+def run(args):
+    summary = {"added": [], "stages": {}, "saved": False}
+    store = EpisodeStore.load()
+
+    resp = None
+    if args.ids:
+        episode_ids = [i.strip() for i in args.ids.split(",") if store.has_id(i.strip())]
+    else:
+        start = time.perf_counter()
+        try:
+            added, resp = add_stage(store, args.count)
+        except Exception as e:
+            print(f"✗ Error fetching feed: {e}")
+            summary["stages"]["add"] = {"status": "failed", "error": str(e)}
+            return summary
+        seconds = time.perf_counter() - start
+        metrics.record_stage("add", seconds)
+        summary["stages"]["add"] = {"status": "ok", "seconds": round(seconds, 3)}
+        summary["added"] = [
+            {"id": ep["id"], "title": ep["title"], "episodeDate": ep["episodeDate"]} for ep in added
+        ]
+        episode_ids = [ep["id"] for ep in added]
+
+    if episode_ids:
+        ctx = Context(store, episode_ids, args)
+        summary["stages"].update(run_dag(ctx))
+        summary["saved"] = store.save()
+        ctx.negatives.save()
+    if resp is not None:
+        podcast_feed.remember(resp, store.fingerprint())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the weekly episode pipeline in one process")
+    parser.add_argument("--count", type=int, default=5, help="Newest feed items to check")
+    parser.add_argument("--ids", help="Comma-separated existing episode ids to run the downstream stages on")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent Wikipedia searches")
+    parser.add_argument("--summary", help="Also write the JSON summary to this file")
+    http_cache.add_cache_args(parser)
+    metrics.add_metrics_args(parser)
+    args = parser.parse_args()
+    http_cache.configure(args)
+    metrics.start("weekly_pipeline", args)
+
+    with redirect_stdout(sys.stderr):
+        summary = run(args)
+    summary["ok"] = all(stage["status"] == "ok" for stage in summary["stages"].values())
+
+    text = json.dumps(summary, indent=2, ensure_ascii=False)
+    print(text)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            f.write(text + "\n")
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    exit(main())